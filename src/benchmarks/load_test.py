@@ -0,0 +1,136 @@
+"""Compare the throughput of the sync and async read endpoints.
+
+Opens ``--concurrency`` keep-alive connections to a running server and keeps
+each busy with GET requests for ``--duration`` seconds, once per endpoint
+pair, then prints requests per second and latency percentiles. Only the
+standard library is used, so it runs anywhere the server is reachable:
+
+    uvicorn config.asgi:application --port 8000 &
+    python benchmarks/load_test.py --token <token> --budget 1 --concurrency 500
+
+``--path`` benchmarks the given paths instead, e.g. to compare run modes:
+
+    python benchmarks/load_test.py --token <token> --path /budgets/ --label gunicorn
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = {
+    "financial-entries": ("/financial-entries/", "/async/financial-entries/"),
+    "categories": ("/categories/", "/async/categories/"),
+    "summary": ("/budgets/{budget}/summary/", "/async/budgets/{budget}/summary/"),
+}
+
+
+async def fetch(reader, writer, host, path, token):
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n"
+        f"Authorization: Token {token}\r\nConnection: keep-alive\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def worker(url, path, token, deadline, latencies, errors):
+    parts = urlsplit(url)
+    try:
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    except OSError:
+        errors.append("connect")
+        return
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = await fetch(reader, writer, parts.netloc, path, token)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        errors.append("connection")
+    finally:
+        writer.close()
+
+
+async def run(url, path, token, concurrency, duration):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            worker(url, path, token, deadline, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    return summarize(path, latencies, errors, elapsed)
+
+
+def summarize(path, latencies, errors, elapsed):
+    result = {
+        "path": path,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        for name, index in (("p50", 49), ("p95", 94), ("p99", 98)):
+            result[f"{name}_ms"] = round(cuts[index] * 1000, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="API token of a user.")
+    parser.add_argument("--budget", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--endpoint", choices=ENDPOINTS, action="append")
+    parser.add_argument("--path", action="append", help="Benchmark this path.")
+    parser.add_argument("--label", default="", help="Added to every result.")
+    args = parser.parse_args()
+
+    if args.path:
+        runs = [(path, "path", path) for path in args.path]
+    else:
+        runs = [
+            (name, mode, path)
+            for name in args.endpoint or ENDPOINTS
+            for mode, path in zip(("sync", "async"), ENDPOINTS[name])
+        ]
+    results = []
+    for name, mode, path in runs:
+        result = asyncio.run(
+            run(
+                args.url,
+                path.format(budget=args.budget),
+                args.token,
+                args.concurrency,
+                args.duration,
+            )
+        )
+        results.append({"endpoint": name, "mode": mode, "label": args.label, **result})
+        print(json.dumps(results[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare DRF's JSONRenderer/JSONParser with the orjson based ones.
+
+Renders a large page of serialized entries with both renderers, checks the
+bytes are identical and prints pages per second and MB/s, then parses the
+rendered page back with both parsers. Needs a filled database, e.g. from
+``manage.py seed_perf``; run it from ``src``:
+
+    python benchmarks/renderers.py --rows 1000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from core.models import FinancialEntry  # noqa: E402
+from core.renderers import ORJSONParser, ORJSONRenderer  # noqa: E402
+from core.serializers import FinancialEntrySerializer  # noqa: E402
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def page_of_entries(rows):
+    request = Request(APIRequestFactory().get("/", HTTP_HOST="localhost"))
+    with override_settings(ALLOWED_HOSTS=["localhost"]):
+        entries = FinancialEntry.objects.order_by("-date", "-id")[:rows]
+        results = FinancialEntrySerializer(
+            entries, many=True, context={"request": request}
+        ).data
+    return {"next": None, "previous": None, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="Entries per page.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = page_of_entries(args.rows)
+    content = JSONRenderer().render(page)
+    if ORJSONRenderer().render(page) != content:
+        sys.exit("The renderers disagree.")
+    megabytes = len(content) / 1e6
+    for name, render in (
+        ("JSONRenderer", JSONRenderer().render),
+        ("ORJSONRenderer", ORJSONRenderer().render),
+    ):
+        seconds = best_of(args.repeat, lambda: render(page))
+        print(json.dumps(result(name, len(page["results"]), megabytes, seconds)))
+    for name, parser_class in (
+        ("JSONParser", JSONParser),
+        ("ORJSONParser", ORJSONParser),
+    ):
+        seconds = best_of(
+            args.repeat, lambda: parser_class().parse(io.BytesIO(content))
+        )
+        print(json.dumps(result(name, len(page["results"]), megabytes, seconds)))
+
+
+def result(name, rows, megabytes, seconds):
+    return {
+        "name": name,
+        "rows": rows,
+        "ms_per_page": round(seconds * 1000, 2),
+        "pages_per_s": round(1 / seconds, 1),
+        "mb_per_s": round(megabytes / seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    main()
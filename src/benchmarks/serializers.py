@@ -0,0 +1,88 @@
+"""Compare rows per second of the DRF serializers and the values() fast path.
+
+Renders the same entries and categories with ``FinancialEntrySerializer`` /
+``CategorySerializer`` over model instances and with
+``core.fastpath.ValuesSerializer`` over ``values()`` rows, once including
+the queries and once on rows fetched beforehand (the fast path still runs
+its query for nested entries then). Needs a filled database,
+e.g. from ``manage.py seed_perf``; run it from ``src``:
+
+    python benchmarks/serializers.py --rows 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from core.fastpath import ValuesSerializer  # noqa: E402
+from core.models import Category, FinancialEntry  # noqa: E402
+from core.serializers import CategorySerializer, FinancialEntrySerializer  # noqa: E402
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def compare(name, serializer_class, queryset, context, repeat):
+    fast = ValuesSerializer(serializer_class(context=context))
+    instances, rows = list(queryset.all()), list(fast.values(queryset))
+
+    def serialize(objects):
+        return serializer_class(objects, many=True, context=context).data
+
+    timings = {
+        "drf": best_of(repeat, lambda: serialize(list(queryset.all()))),
+        "fast": best_of(repeat, lambda: fast.render(fast.values(queryset))),
+        "drf_serialize_only": best_of(repeat, lambda: serialize(instances)),
+        "fast_serialize_only": best_of(repeat, lambda: fast.render(rows)),
+    }
+    result = {"serializer": name, "rows": len(rows)}
+    for path, seconds in timings.items():
+        result[f"{path}_rows_per_s"] = round(len(rows) / seconds)
+    result["speedup"] = round(timings["drf"] / timings["fast"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    request = Request(APIRequestFactory().get("/", HTTP_HOST="localhost"))
+    context = {"request": request}
+    entries = FinancialEntry.objects.order_by("-date", "-id")[: args.rows]
+    categories = (
+        Category.objects.prefetch_related("financial_entries")
+        .with_bilance()
+        .order_by("pk")[: max(args.rows // 100, 1)]
+    )
+    with override_settings(ALLOWED_HOSTS=["localhost"]):
+        for name, serializer_class, queryset in (
+            ("FinancialEntrySerializer", FinancialEntrySerializer, entries),
+            ("CategorySerializer", CategorySerializer, categories),
+        ):
+            result = compare(name, serializer_class, queryset, context, args.repeat)
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Gunicorn settings for the production run mode.
+
+    gunicorn -c config/gunicorn.conf.py
+
+Every value can be overridden from the environment. By default the WSGI
+application runs in threaded workers; ``GUNICORN_WORKER_CLASS=uvicorn``
+serves the ASGI application instead, for the ``/async/`` endpoints.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# (2 x cores) + 1 keeps every core busy while other workers wait on I/O.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+if os.environ.get("GUNICORN_WORKER_CLASS", "gthread") == "uvicorn":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "config.asgi:application"
+else:
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+    wsgi_app = "config.wsgi:application"
+
+# Each worker thread keeps its own database connection for CONN_MAX_AGE
+# seconds, so workers x threads must stay below the database (or pgbouncer)
+# connection limit.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth.
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,12 +42,15 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
+    "django_filters",
     "core",
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -103,10 +107,68 @@ else:
         "PASSWORD": POSTGRES_PASSWORD,
         "HOST": POSTGRES_HOST,
         "PORT": POSTGRES_PORT,
+        # Keep connections open between requests and check them before reuse.
+        "CONN_MAX_AGE": env.int("CONN_MAX_AGE", default=60),
+        "CONN_HEALTH_CHECKS": True,
+        # Required behind pgbouncer in transaction pooling mode.
+        "DISABLE_SERVER_SIDE_CURSORS": env.bool(
+            "DISABLE_SERVER_SIDE_CURSORS", default=False
+        ),
     }
 
 DATABASES = {"default": default_database}
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_URL examples: locmemcache://, filecache:///var/tmp/django_cache,
+# redis://redis:6379/1
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# The per-user versions behind cached lists, ETags and Last-Modified live in
+# this cache. gunicorn runs several worker processes, so in production it
+# has to be shared by all of them, otherwise a write only reaches the
+# versions of the worker that handled it and the others keep answering with
+# stale lists and 304s.
+RUN_MODE = env("RUN_MODE", default="development")
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+if RUN_MODE == "production" and CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        "RUN_MODE=production needs a CACHE_URL shared by all workers, "
+        "e.g. redis://redis:6379/1."
+    )
+
+# Budget and category list responses are cached per user, see core.cache.
+# Set RESPONSE_CACHE_TIMEOUT=0 to disable it.
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = env.int("RESPONSE_CACHE_TIMEOUT", default=300)
+
+# Entry and category lists are rendered from values() rows, see core.fastpath.
+FAST_LIST_SERIALIZERS = env.bool("FAST_LIST_SERIALIZERS", default=True)
+
+# Query counts and timings per request as Server-Timing headers, JSON log
+# lines and Prometheus metrics at /metrics/, see core.instrumentation.
+INSTRUMENTATION_ENABLED = env.bool("INSTRUMENTATION_ENABLED", default=False)
+# /metrics/ is served to staff users and to requests with
+# "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.instrumentation": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -158,5 +220,15 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson based, with the same output as DRF's JSONRenderer and JSONParser.
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
 }
@@ -0,0 +1,165 @@
+"""Async versions of the hot read endpoints, served under ``/async/``.
+
+They use Django's async ORM, so under an ASGI server a worker does not hold
+a thread while it waits on the database or on a slow client. DRF views are
+synchronous, so authentication, parsing of the query string and rendering
+are done here by hand with the same DRF classes the sync views use, and the
+output matches the sync endpoints. Filters and ordering parameters of the
+sync endpoints are not supported.
+"""
+import base64
+import binascii
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, prefetch_related_objects
+from django.http import HttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.models import Budget, Category, FinancialEntry
+from core.pagination import FinancialEntryCursorPagination
+from core.renderers import ORJSONRenderer
+from core.reports import abudget_summary
+from core.serializers import (
+    BudgetSummaryQuerySerializer,
+    BudgetSummarySerializer,
+    CategorySerializer,
+    FinancialEntrySerializer,
+)
+
+
+def async_api_view(view):
+    """Authenticate like the DRF views and render the result as JSON."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return _render({"detail": f'Method "{request.method}" not allowed.'}, 405)
+        try:
+            user = await sync_to_async(_authenticate)(request)
+            if not user.is_authenticated:
+                raise NotAuthenticated()
+            return _render(await view(request, user, *args, **kwargs))
+        except APIException as exc:
+            # Like DRF, answer 403 as session authentication sends no challenge.
+            if isinstance(exc, NotAuthenticated):
+                exc.status_code = 403
+            data = exc.detail
+            if not isinstance(data, (list, dict)):
+                data = {"detail": data}
+            return _render(data, exc.status_code)
+
+    return wrapper
+
+
+def _authenticate(request):
+    authenticators = [SessionAuthentication(), TokenAuthentication()]
+    return Request(request, authenticators=authenticators).user
+
+
+def _render(data, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(data), content_type="application/json", status=status
+    )
+
+
+@async_api_view
+async def financial_entry_list(request, user):
+    """Keyset paginated like ``FinancialEntryCursorPagination``, forwards only."""
+    page_size = _page_size(request)
+    entries = FinancialEntry.objects.filter(
+        category__budget__in=Budget.objects.visible_to(user)
+    ).order_by("-date", "-id")
+    if "cursor" in request.GET:
+        date, pk = _decode_cursor(request.GET["cursor"])
+        entries = entries.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+    entries = [entry async for entry in entries[: page_size + 1]]
+    url = request.build_absolute_uri()
+    next_url = None
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        cursor = _encode_cursor(entries[-1])
+        next_url = replace_query_param(url, "cursor", cursor)
+    context = {"request": request}
+    return {
+        "next": next_url,
+        "results": FinancialEntrySerializer(entries, many=True, context=context).data,
+    }
+
+
+@async_api_view
+async def category_list(request, user):
+    """Page number paginated like the sync category list."""
+    categories = Category.objects.filter(
+        budget__in=Budget.objects.visible_to(user)
+    ).with_bilance()
+    count = await categories.acount()
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        raise NotFound("Invalid page.")
+    if page < 1 or (page - 1) * page_size >= max(count, 1):
+        raise NotFound("Invalid page.")
+    start = (page - 1) * page_size
+    categories = [category async for category in categories[start : start + page_size]]
+    await sync_to_async(prefetch_related_objects)(categories, "financial_entries")
+    url = request.build_absolute_uri()
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, "page")
+    elif page > 2:
+        previous_url = replace_query_param(url, "page", page - 1)
+    context = {"request": request}
+    return {
+        "count": count,
+        "next": replace_query_param(url, "page", page + 1)
+        if start + page_size < count
+        else None,
+        "previous": previous_url,
+        "results": CategorySerializer(categories, many=True, context=context).data,
+    }
+
+
+@async_api_view
+async def budget_summary(request, user, pk):
+    query = BudgetSummaryQuerySerializer(data=request.GET)
+    query.is_valid(raise_exception=True)
+    try:
+        budget = await Budget.objects.visible_to(user).aget(pk=pk)
+    except Budget.DoesNotExist:
+        raise NotFound()
+    totals = await abudget_summary(budget, **query.validated_data)
+    return BudgetSummarySerializer(totals, many=True).data
+
+
+def _page_size(request):
+    pagination = FinancialEntryCursorPagination
+    try:
+        page_size = int(request.GET[pagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return settings.REST_FRAMEWORK["PAGE_SIZE"]
+    if page_size < 1:
+        return settings.REST_FRAMEWORK["PAGE_SIZE"]
+    return min(page_size, pagination.max_page_size)
+
+
+def _encode_cursor(entry):
+    position = f"{entry.date.isoformat()}|{entry.pk}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        date, pk = parse_datetime(date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise NotFound("Invalid cursor")
+    if date is None:
+        raise NotFound("Invalid cursor")
+    return date, pk
@@ -0,0 +1,133 @@
+"""Per-user cache of list responses and conditional GET support.
+
+Every user has a version stored in the cache. Invalidating a user replaces
+the version, so all of their cached responses are skipped at once on any
+cache backend, without having to find and delete keys. The version also
+serves as the validator behind ``ETag`` and ``Last-Modified``.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def invalidate_users(user_ids):
+    """Drop the cached responses of every user in ``user_ids``."""
+    versions = {_version_key(user_id): _new_version() for user_id in user_ids}
+    if versions:
+        get_cache().set_many(versions, timeout=None)
+
+
+def _new_version():
+    return f"{time.time_ns()}-{uuid.uuid4().hex}"
+
+
+def _version_time(version):
+    """Seconds since the epoch, rounded up, at which ``version`` was created."""
+    return -(-int(version.split("-")[0]) // 10**9)
+
+
+def _version_key(user_id):
+    return f"response-cache:{user_id}:version"
+
+
+def _user_version(cache, user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+class CachedListMixin:
+    """Cache ``list`` responses per user, endpoint and query parameters.
+
+    The signal handlers in ``core.signals`` invalidate every user who can see
+    a changed budget.
+    """
+
+    def list(self, request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if not timeout or not request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        uri = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        version = _user_version(cache, request.user.pk)
+        key = f"response-cache:{request.user.pk}:{version}:{self.basename}:{uri}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, _plain(response.data), timeout)
+        return response
+
+
+def _plain(data):
+    """Copy serializer output into builtin types that pickle cheaply.
+
+    DRF's ``Hyperlink`` strings keep the linked instance and pickle its
+    ``str()``, which may load deferred fields.
+    """
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    if isinstance(data, str):
+        return str(data)
+    return data
+
+
+class NotModified(APIException):
+    status_code = 304
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """Answer ``GET`` requests with a matching validator with 304 Not Modified.
+
+    The ``ETag`` hashes the user's version with the request URI and media
+    type, and ``Last-Modified`` is the time the version was created, so
+    validators are checked before any query or serializer runs.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.validators = None
+        if request.method not in ("GET", "HEAD") or not request.user.is_authenticated:
+            return
+        version = _user_version(get_cache(), request.user.pk)
+        etag = hashlib.md5(
+            f"{version}:{request.accepted_media_type}:{request.build_absolute_uri()}".encode()
+        ).hexdigest()
+        self.validators = (quote_etag(etag), _version_time(version))
+        response = get_conditional_response(request, *self.validators)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, "validators", None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response.headers["ETag"] = etag
+            response.headers["Last-Modified"] = http_date(last_modified)
+        return response
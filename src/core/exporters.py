@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+
+from django.http import StreamingHttpResponse
+
+from core.utils import chunked
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+COLUMNS = (
+    "id",
+    "date",
+    "budget",
+    "category",
+    "category_name",
+    "entry_type",
+    "amount",
+    "description",
+    "user",
+)
+DATE, AMOUNT = COLUMNS.index("date"), COLUMNS.index("amount")
+LOOKUPS = {"budget": "category__budget", "category_name": "category__name"}
+FORMATS = ("csv", "ndjson", "parquet")
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def export_response(queryset, format, filename, chunk_size=2000):
+    """Stream the entries of ``queryset`` as a file download.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time and
+    written out chunk by chunk, so memory stays flat for any export size.
+    """
+    if format == "parquet" and pyarrow is None:
+        raise ExportUnavailable("Parquet export requires the pyarrow package.")
+    rows = (
+        queryset.order_by("-date", "-id")
+        .values_list(*(LOOKUPS.get(column, column) for column in COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+    writer = {"csv": stream_csv, "ndjson": stream_ndjson, "parquet": stream_parquet}
+    response = StreamingHttpResponse(
+        writer[format](chunked(rows, chunk_size)), content_type=CONTENT_TYPES[format]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{format}"'
+    return response
+
+
+def stream_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for chunk in chunks:
+        writer.writerows(_formatted(row) for row in chunk)
+        yield _drain(buffer)
+    yield _drain(buffer)
+
+
+def stream_ndjson(chunks):
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(COLUMNS, _formatted(row)))) + "\n" for row in chunk
+        )
+
+
+def stream_parquet(chunks):
+    schema = pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("date", pyarrow.timestamp("us", tz="UTC")),
+            ("budget", pyarrow.int64()),
+            ("category", pyarrow.int64()),
+            ("category_name", pyarrow.string()),
+            ("entry_type", pyarrow.string()),
+            ("amount", pyarrow.decimal128(10, 2)),
+            ("description", pyarrow.string()),
+            ("user", pyarrow.int64()),
+        ]
+    )
+    buffer = _ParquetSink()
+    with pyarrow.parquet.ParquetWriter(buffer, schema) as writer:
+        for chunk in chunks:
+            # Every chunk becomes one row group flushed to the client.
+            table = pyarrow.Table.from_pylist(
+                [dict(zip(COLUMNS, row)) for row in chunk], schema=schema
+            )
+            writer.write_table(table)
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only sink that hands out written bytes but keeps counting offsets.
+
+    Parquet records absolute offsets in its footer, so ``tell()`` must keep
+    growing after the bytes written so far were sent to the client.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _formatted(row):
+    """Format dates and amounts the way the API renders them."""
+    row = list(row)
+    row[DATE] = row[DATE].isoformat().replace("+00:00", "Z")
+    row[AMOUNT] = str(row[AMOUNT])
+    return row
+
+
+def _drain(buffer):
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
@@ -0,0 +1,182 @@
+"""Read-only rendering of list pages straight from ``QuerySet.values()``.
+
+A ``ModelSerializer`` builds a model instance per row and calls
+``reverse()`` for every hyperlink of every row. ``ValuesSerializer``
+compiles a serializer's fields once into columns of a ``values()`` query
+and per-field converters: hyperlinks are formatted from a URL template
+reversed once per request, and other values go through the original
+field's ``to_representation``, so the rendered JSON is byte for byte the
+same. Serializers with fields it does not know raise ``Unsupported`` and
+are rendered the usual way.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ForeignKey
+from rest_framework import serializers
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    HyperlinkedRelatedField,
+    PrimaryKeyRelatedField,
+)
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from core.fields import EntriesBilanceField
+
+PLACEHOLDER = "__lookup__"
+
+
+class Unsupported(Exception):
+    pass
+
+
+class ValuesSerializer:
+    """Render ``serializer`` (an unbound instance with context) from value rows.
+
+    ``values(queryset)`` turns a queryset into the ``values()`` query the
+    fields need, ``render(rows)`` renders rows fetched from it.
+    """
+
+    def __init__(self, serializer):
+        request = serializer.context.get("request")
+        if request is None or serializer.context.get("format"):
+            # Links with a format suffix or without a host are left to DRF.
+            raise Unsupported("Requests with a format suffix are not supported.")
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.fields = []
+        self.nested = []
+        for name, field in serializer.fields.items():
+            if not field.write_only:
+                self.fields.append((name, *self.compile(field, request)))
+
+    def compile(self, field, request):
+        """Return ``(column, convert)`` for ``field``."""
+        if isinstance(field, HyperlinkedIdentityField):
+            return self.column(field.lookup_field), self.link(field, request)
+        if isinstance(field, (HyperlinkedRelatedField, PrimaryKeyRelatedField)):
+            model_field = self.model._meta.get_field(field.source)
+            if not isinstance(model_field, ForeignKey):
+                raise Unsupported(f"{field.source} is not a foreign key.")
+            if isinstance(field, PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    raise Unsupported("pk_field is not supported.")
+                return self.column(model_field.attname), _identity
+            if field.lookup_field != "pk":
+                raise Unsupported(f"{field.source} is not linked by pk.")
+            return self.column(model_field.attname), _optional(
+                self.link(field, request)
+            )
+        if isinstance(field, EntriesBilanceField):
+            return self.column(field.annotation), field.to_representation
+        if isinstance(field, serializers.ListSerializer):
+            return self.column("pk"), self.nest(field)
+        if isinstance(field, serializers.ReadOnlyField):
+            return self.column(self.lookup(field)), _identity
+        if type(field) in MODEL_FIELD_TYPES:
+            return self.column(self.lookup(field)), _optional(field.to_representation)
+        raise Unsupported(f"{type(field).__name__} is not supported.")
+
+    def lookup(self, field):
+        """Return the ``values()`` lookup of a field sourced from a model column."""
+        model = self.model
+        try:
+            for attr in field.source_attrs[:-1]:
+                relation = model._meta.get_field(attr)
+                if not (relation.many_to_one or relation.one_to_one):
+                    raise Unsupported(f"{field.source} is not a column.")
+                model = relation.related_model
+            model_field = model._meta.get_field(field.source_attrs[-1])
+        except FieldDoesNotExist:
+            raise Unsupported(f"{field.source} is not a column.")
+        if not model_field.concrete or model_field.is_relation:
+            raise Unsupported(f"{field.source} is not a column.")
+        return "__".join(field.source_attrs)
+
+    def column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return lookup
+
+    def link(self, field, request):
+        """Format the URL of ``field`` for a lookup value like ``reverse()`` would."""
+        kwargs = {field.lookup_url_kwarg: PLACEHOLDER}
+        url = reverse(field.view_name, kwargs=kwargs, request=request)
+        prefix, suffix = url.split(PLACEHOLDER)
+        return lambda value: serializers.Hyperlink(f"{prefix}{value}{suffix}", None)
+
+    def nest(self, field):
+        relation = self.model._meta.get_field(field.source)
+        if not relation.one_to_many:
+            raise Unsupported(f"{field.source} is not a reverse foreign key.")
+        nested = ValuesSerializer(field.child)
+        remote = nested.column(relation.field.attname)
+        grouped = {}
+        self.nested.append((nested, relation, remote, grouped))
+        return lambda pk: [nested.render_row(row) for row in grouped.get(pk, ())]
+
+    def values(self, queryset):
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def render(self, rows):
+        rows = list(rows)
+        for nested, relation, remote, grouped in self.nested:
+            # Same query and ordering as prefetch_related() would use.
+            related = nested.values(
+                relation.related_model._default_manager.filter(
+                    **{f"{remote}__in": {row["pk"] for row in rows}}
+                )
+            )
+            grouped.clear()
+            for child in related:
+                grouped.setdefault(child[remote], []).append(child)
+        return [self.render_row(row) for row in rows]
+
+    def render_row(self, row):
+        return {name: convert(row[column]) for name, column, convert in self.fields}
+
+
+MODEL_FIELD_TYPES = {
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.EmailField,
+    serializers.FloatField,
+    serializers.IntegerField,
+}
+
+
+def _identity(value):
+    return value
+
+
+def _optional(convert):
+    """``None`` stays ``None``, as DRF skips ``to_representation`` for it."""
+    return lambda value: None if value is None else convert(value)
+
+
+class FastListMixin:
+    """Render ``list`` pages with ``ValuesSerializer`` when the serializer allows.
+
+    Only used while ``settings.FAST_LIST_SERIALIZERS`` is on; lists whose
+    serializer has unsupported fields are rendered by the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        try:
+            fast = ValuesSerializer(self.get_serializer())
+        except Unsupported:
+            return super().list(request, *args, **kwargs)
+        # Cursor pagination reads its position from the ordering columns.
+        for ordering in getattr(self.paginator, "ordering", ()):
+            fast.column(ordering.lstrip("-"))
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(fast.render(queryset))
+        return self.get_paginated_response(fast.render(page))
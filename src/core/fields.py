@@ -1,9 +1,28 @@
+from urllib.parse import urlparse
+
+from django.urls import Resolver404, get_script_prefix, resolve
 from rest_framework import serializers
 from core.models import FinancialEntry
 
 
 class EntriesBilanceField(serializers.Field):
+    """Bilance of a category.
+
+    Reads the ``bilance_total`` annotation added by
+    ``Category.objects.with_bilance()`` and falls back to summing the
+    related entries in Python when the queryset was not annotated.
+    """
+
+    annotation = "bilance_total"
+
+    def get_attribute(self, instance):
+        if hasattr(instance, self.annotation):
+            return getattr(instance, self.annotation)
+        return super().get_attribute(instance)
+
     def to_representation(self, value):
+        if not hasattr(value, "all"):
+            return value or 0
         bilance = 0
         for entry in value.all():
             if FinancialEntry.INCOME == entry.entry_type:
@@ -11,3 +30,39 @@ class EntriesBilanceField(serializers.Field):
             if FinancialEntry.EXPENSE == entry.entry_type:
                 bilance -= entry.amount
         return bilance
+
+
+class BatchHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """Hyperlinked relation resolved from objects preloaded for a whole batch.
+
+    A list serializer loads every referenced object with one query and
+    stores them as ``{lookup value: object}`` in ``context[batch_key]``.
+    Without that mapping the field behaves like ``HyperlinkedRelatedField``.
+    """
+
+    def __init__(self, batch_key, **kwargs):
+        self.batch_key = batch_key
+        super().__init__(**kwargs)
+
+    def get_lookup_value(self, data):
+        """Return the lookup value ``data`` links to, or None for a bad link."""
+        try:
+            path = urlparse(data).path
+            prefix = get_script_prefix()
+            if path.startswith(prefix):
+                path = "/" + path[len(prefix) :]
+            match = resolve(path)
+        except (AttributeError, TypeError, ValueError, Resolver404):
+            return None
+        if match.view_name != self.view_name:
+            return None
+        return match.kwargs.get(self.lookup_url_kwarg)
+
+    def get_object(self, view_name, view_args, view_kwargs):
+        batch = self.context.get(self.batch_key)
+        if batch is None:
+            return super().get_object(view_name, view_args, view_kwargs)
+        try:
+            return batch[str(view_kwargs[self.lookup_url_kwarg])]
+        except KeyError:
+            raise self.get_queryset().model.DoesNotExist
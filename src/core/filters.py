@@ -0,0 +1,152 @@
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+from django_filters.fields import IsoDateTimeField
+from rest_framework.filters import OrderingFilter
+
+from core.models import Category, FinancialEntry
+
+
+class DateOrDateTimeField(IsoDateTimeField):
+    """An ISO 8601 datetime, or a ``date`` when the value is a bare date."""
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            try:
+                day = parse_date(value.strip())
+            except ValueError:
+                raise ValidationError(self.error_messages["invalid"], code="invalid")
+            if day is not None:
+                return day
+        return super().to_python(value)
+
+
+class DateTimeUntilFilter(filters.IsoDateTimeFilter):
+    """Inclusive upper bound on a datetime where a bare date is the whole day.
+
+    ``date__lte=2024-01-31`` keeps entries before midnight of February 1st,
+    the way ``date_to`` of the budget summary does.
+    """
+
+    field_class = DateOrDateTimeField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("lookup_expr", "lte")
+        super().__init__(*args, **kwargs)
+
+    def get_condition(self, value):
+        if isinstance(value, datetime):
+            return Q(**{f"{self.field_name}__{self.lookup_expr}": value})
+        next_day = datetime.combine(value + timedelta(days=1), time.min)
+        return Q(**{f"{self.field_name}__lt": timezone.make_aware(next_day)})
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return self.get_method(qs)(self.get_condition(value))
+
+
+class FinancialEntryFilter(filters.FilterSet):
+    """Filter entries by date and amount ranges, type, category and budget.
+
+    Dates and amounts are compared as values on indexed columns, never as
+    text. Bounds are inclusive; a date without a time starts at midnight UTC
+    as a lower bound and covers the whole day as an upper bound.
+    ``q`` searches the descriptions, see ``FinancialEntryQuerySet.search``.
+    """
+
+    category = filters.NumberFilter(field_name="category")
+    budget = filters.NumberFilter(field_name="category__budget")
+    date__lte = DateTimeUntilFilter(field_name="date")
+    q = filters.CharFilter(method="search")
+
+    class Meta:
+        model = FinancialEntry
+        fields = {
+            "date": ["gte"],
+            "amount": ["gte", "lte"],
+            "entry_type": ["exact"],
+        }
+
+    def search(self, queryset, name, value):
+        return queryset.search(value)
+
+
+class CategoryFilter(filters.FilterSet):
+    """Filter categories by budget and by the entries they contain.
+
+    The entry filters keep categories with at least one entry matching all
+    of them. They are combined into a single ``EXISTS`` on the entries of
+    the category, so a date range only matches an entry inside it and a
+    category is returned once however many of its entries match.
+    """
+
+    ENTRY_FILTERS = (
+        "date__gte",
+        "date__lte",
+        "amount__gte",
+        "amount__lte",
+        "entry_type",
+    )
+
+    budget = filters.NumberFilter(field_name="budget")
+    date__gte = filters.IsoDateTimeFilter(field_name="date", lookup_expr="gte")
+    date__lte = DateTimeUntilFilter(field_name="date")
+    amount__gte = filters.NumberFilter(field_name="amount", lookup_expr="gte")
+    amount__lte = filters.NumberFilter(field_name="amount", lookup_expr="lte")
+    entry_type = filters.ChoiceFilter(
+        field_name="entry_type", choices=FinancialEntry.ENTRY_TYPES
+    )
+
+    class Meta:
+        model = Category
+        fields = ["budget"]
+
+    def filter_queryset(self, queryset):
+        conditions = []
+        for name, value in self.form.cleaned_data.items():
+            declared = self.filters[name]
+            if name not in self.ENTRY_FILTERS:
+                queryset = declared.filter(queryset, value)
+            elif value in EMPTY_VALUES:
+                continue
+            elif isinstance(declared, DateTimeUntilFilter):
+                conditions.append(declared.get_condition(value))
+            else:
+                lookup = f"{declared.field_name}__{declared.lookup_expr}"
+                conditions.append(Q(**{lookup: value}))
+        if conditions:
+            entries = FinancialEntry.objects.filter(
+                *conditions, category=OuterRef("pk")
+            )
+            queryset = queryset.filter(Exists(entries))
+        return queryset
+
+
+class CategoryOrderingFilter(OrderingFilter):
+    """Order categories by name or by ``CategoryQuerySet.AGGREGATES``.
+
+    Aggregates are only computed when ordered by, ``pk`` breaks ties so
+    pages do not overlap and categories without entries come last.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if not ordering:
+            return queryset
+        names = [field.lstrip("-") for field in ordering]
+        queryset = queryset.alias_aggregates(
+            *[name for name in names if name in queryset.AGGREGATES]
+        )
+        order_by = [
+            F(name).desc(nulls_last=True)
+            if field.startswith("-")
+            else F(name).asc(nulls_last=True)
+            for field, name in zip(ordering, names)
+        ]
+        return queryset.order_by(*order_by, "pk")
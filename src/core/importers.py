@@ -0,0 +1,246 @@
+import io
+import re
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+import petl
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import FinancialEntry
+from core.utils import chunked
+
+FORMATS = ("csv", "ofx")
+CSV_COLUMNS = ("date", "amount", "description")
+OFX_DATE = re.compile(
+    r"^(?P<date>\d{8})(?P<time>\d{6})?(?:\.\d+)?"
+    r"(?:\[(?P<offset>[+-]?\d+(?:\.\d+)?)(?::[^\]]*)?\])?"
+)
+
+
+class StatementError(ValueError):
+    def __init__(self, message, number=None):
+        self.number = number
+        super().__init__(message if number is None else f"Row {number}: {message}")
+
+
+class StatementRow(NamedTuple):
+    number: int
+    date: datetime
+    amount: Decimal
+    description: str
+
+
+def guess_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else None
+
+
+def parse_statement(source, format, encoding="utf-8"):
+    """Return a lazy iterator of ``StatementRow`` read from ``source``.
+
+    ``source`` is a path or a seekable binary file, like Django's
+    ``UploadedFile``.
+    """
+    if format == "csv":
+        return parse_csv(source, encoding)
+    if format == "ofx":
+        return parse_ofx(source, encoding)
+    raise ValueError(f"Unsupported statement format: {format}")
+
+
+def parse_csv(source, encoding="utf-8"):
+    """Read a CSV statement with ``date``, ``amount`` and ``description`` columns."""
+    if not isinstance(source, str):
+        source = _FileSource(source)
+    table = petl.fromcsv(source, encoding=encoding)
+    header = petl.header(table)
+    missing = [column for column in CSV_COLUMNS if column not in header]
+    if missing:
+        raise StatementError(f"Missing columns: {', '.join(missing)}")
+    for number, row in enumerate(petl.dicts(table.cut(*CSV_COLUMNS)), start=1):
+        yield _statement_row(number, row["date"], row["amount"], row["description"])
+
+
+def parse_ofx(source, encoding="utf-8"):
+    """Read the ``<STMTTRN>`` transactions of an SGML (1.x) or XML (2.x) OFX file."""
+    if isinstance(source, str):
+        opened = open(source, "rb")
+    else:
+        opened = _FileSource(source).open()
+    with opened as buffer:
+        lines = io.TextIOWrapper(buffer, encoding=encoding, errors="replace")
+        try:
+            yield from _ofx_transactions(lines)
+        finally:
+            lines.detach()
+
+
+def _ofx_transactions(lines):
+    transaction, number = None, 0
+    for tag, value in _ofx_tokens(lines):
+        if tag in ("STMTTRN", "/STMTTRN", "/BANKTRANLIST"):
+            # Also close a transaction whose end tag was left out.
+            if transaction is not None:
+                yield _ofx_row(number, transaction)
+            transaction = None
+            if tag == "STMTTRN":
+                transaction, number = {}, number + 1
+        elif transaction is not None and not tag.startswith("/"):
+            transaction[tag] = value
+
+
+def _ofx_row(number, transaction):
+    description = (transaction.get("NAME"), transaction.get("MEMO"))
+    return _statement_row(
+        number,
+        transaction.get("DTPOSTED", ""),
+        transaction.get("TRNAMT", ""),
+        " ".join(part for part in description if part),
+    )
+
+
+class _FileSource:
+    """petl style source that rewinds an already open file instead of closing it."""
+
+    def __init__(self, file):
+        self.file = file
+
+    @contextmanager
+    def open(self, mode="rb"):
+        self.file.seek(0)
+        yield self.file
+
+
+def _ofx_tokens(lines):
+    """Yield ``(TAG, value)`` pairs, keeping only the unfinished tag in memory."""
+    pending = ""
+    for chunk in lines:
+        *parts, pending = (pending + chunk).split("<")
+        for part in parts:
+            if part:
+                tag, _, value = part.partition(">")
+                yield tag.strip().upper(), value.strip()
+    if pending:
+        tag, _, value = pending.partition(">")
+        yield tag.strip().upper(), value.strip()
+
+
+def _statement_row(number, date, amount, description):
+    return StatementRow(
+        number=number,
+        date=_parse_date(number, date),
+        amount=_parse_amount(number, amount),
+        description=(description or "").strip(),
+    )
+
+
+def _parse_date(number, value):
+    value = (value or "").strip()
+    # OFX dates look like 20210105[120000[.000]][[-5:EST]], the bracket
+    # holds the offset from UTC in hours and an optional zone name.
+    ofx_date = OFX_DATE.match(value)
+    if ofx_date:
+        date = datetime.strptime(ofx_date["date"], "%Y%m%d")
+        if ofx_date["time"]:
+            clock = datetime.strptime(ofx_date["time"], "%H%M%S").time()
+            date = datetime.combine(date, clock)
+        if ofx_date["offset"]:
+            try:
+                offset = dt_timezone(timedelta(hours=float(ofx_date["offset"])))
+            except ValueError:
+                raise StatementError(f"Invalid date: {value!r}", number)
+            date = date.replace(tzinfo=offset)
+    else:
+        try:
+            date = parse_datetime(value) or parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            raise StatementError(f"Invalid date: {value!r}", number)
+        if not isinstance(date, datetime):
+            date = datetime.combine(date, time.min)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _parse_amount(number, value):
+    try:
+        amount = Decimal((value or "").strip().replace(",", "."))
+    except InvalidOperation:
+        raise StatementError(f"Invalid amount: {value!r}", number)
+    if not amount.is_finite():
+        raise StatementError(f"Invalid amount: {value!r}", number)
+    # Rejected rather than rounded: the database would round a third decimal
+    # half-even on SQLite and half-up on PostgreSQL, and fail on overflow.
+    field = FinancialEntry._meta.get_field("amount")
+    try:
+        DecimalValidator(field.max_digits, field.decimal_places)(amount.normalize())
+    except ValidationError as error:
+        raise StatementError(f"Invalid amount {value!r}: {error.messages[0]}", number)
+    return amount
+
+
+class StatementImporter:
+    """Write statement rows into a budget as ``FinancialEntry`` rows.
+
+    Rows are consumed lazily and inserted with ``bulk_create`` every
+    ``chunk_size`` rows, so memory does not grow with the statement size.
+    ``rules`` maps regular expressions matched against the description to
+    category names; rows matching no rule go to ``default_category``.
+    """
+
+    def __init__(self, budget, default_category, rules=None, chunk_size=1000):
+        categories = {category.name: category for category in budget.categories.all()}
+        unknown = {default_category, *(rules or {}).values()} - categories.keys()
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(sorted(unknown))}")
+        self.budget = budget
+        self.default_category = categories[default_category]
+        self.rules = [
+            (_compile_rule(pattern), categories[name])
+            for pattern, name in (rules or {}).items()
+        ]
+        self.chunk_size = chunk_size
+
+    def get_category(self, description):
+        for pattern, category in self.rules:
+            if pattern.search(description):
+                return category
+        return self.default_category
+
+    def build_entry(self, row):
+        return FinancialEntry(
+            user_id=self.budget.user_id,
+            category=self.get_category(row.description),
+            amount=abs(row.amount),
+            description=row.description,
+            date=row.date,
+            entry_type=FinancialEntry.EXPENSE
+            if row.amount < 0
+            else FinancialEntry.INCOME,
+        )
+
+    def run(self, rows, on_progress=None):
+        """Import ``rows`` in one transaction and return the number of entries."""
+        imported = 0
+        with transaction.atomic():
+            for batch in chunked(map(self.build_entry, rows), self.chunk_size):
+                FinancialEntry.objects.bulk_create(batch)
+                imported += len(batch)
+                if on_progress is not None:
+                    on_progress(imported)
+        return imported
+
+
+def _compile_rule(pattern):
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as error:
+        raise ValueError(f"Invalid rule {pattern!r}: {error}")
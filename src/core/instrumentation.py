@@ -0,0 +1,262 @@
+"""Per-request query, SQL time and serializer time instrumentation.
+
+With ``INSTRUMENTATION_ENABLED`` every request records the number of
+database queries, the time spent in SQL and in DRF serializers (or in
+``core.fastpath`` rendering list pages), and the name of the view. They
+are sent back as a ``Server-Timing`` header, logged as one JSON line on
+the ``core.instrumentation`` logger and aggregated as Prometheus metrics
+served at ``/metrics/``. When the flag is off the
+middleware removes itself at startup and nothing is patched, so requests
+pay nothing.
+
+Metrics are kept in the memory of each process; with several gunicorn
+workers every scrape sees the worker that answered it.
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.serializers import BaseSerializer
+
+from core.fastpath import ValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "sql_time", "serializer_time", "serializer_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_time += time.perf_counter() - started
+
+
+def _add_query_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _timed_serialization(serialize):
+    def timed(*args, **kwargs):
+        metrics = _current.get()
+        # Only the outermost serializer counts, nested ones are part of it.
+        if metrics is None or metrics.serializer_depth:
+            return serialize(*args, **kwargs)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return serialize(*args, **kwargs)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+
+    timed.instrumented = True
+    return timed
+
+
+_install_lock = threading.Lock()
+
+
+def install():
+    """Hook the query recorder into every connection and time serializers."""
+    with _install_lock:
+        connection_created.connect(
+            _add_query_recorder, dispatch_uid="core.instrumentation"
+        )
+        for connection in connections.all(initialized_only=True):
+            _add_query_recorder(connection)
+        data = BaseSerializer.data.fget
+        if not getattr(data, "instrumented", False):
+            BaseSerializer.data = property(_timed_serialization(data))
+        # Fast list pages are rendered without ``serializer.data``.
+        render = ValuesSerializer.render
+        if not getattr(render, "instrumented", False):
+            ValuesSerializer.render = _timed_serialization(render)
+
+
+class Registry:
+    """Thread safe counters rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+            self.totals = defaultdict(lambda: defaultdict(float))
+
+    def observe(self, view, method, status, duration, metrics):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            self.durations[view][bisect_left(DURATION_BUCKETS, duration)] += 1
+            totals = self.totals[view]
+            totals["request_duration_seconds_sum"] += duration
+            totals["db_queries_total"] += metrics.queries
+            totals["db_query_duration_seconds_total"] += metrics.sql_time
+            totals["serializer_duration_seconds_total"] += metrics.serializer_time
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP http_requests_total Requests by view, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (view, method, status), count in sorted(self.requests.items()):
+                labels = _labels(view=view, method=method, status=status)
+                lines.append(f"http_requests_total{{{labels}}} {count}")
+            lines += [
+                "# HELP http_request_duration_seconds Request duration by view.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for view, buckets in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip((*DURATION_BUCKETS, "+Inf"), buckets):
+                    cumulative += count
+                    labels = _labels(view=view, le=bound)
+                    lines.append(
+                        f"http_request_duration_seconds_bucket{{{labels}}} {cumulative}"
+                    )
+                total = self.totals[view]["request_duration_seconds_sum"]
+                labels = _labels(view=view)
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+                lines.append(
+                    f"http_request_duration_seconds_count{{{labels}}} {cumulative}"
+                )
+            for name, help in (
+                ("db_queries_total", "Database queries by view."),
+                ("db_query_duration_seconds_total", "Time spent in SQL by view."),
+                ("serializer_duration_seconds_total", "Time spent serializing."),
+            ):
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+                for view, totals in sorted(self.totals.items()):
+                    lines.append(f"{name}{{{_labels(view=view)}}} {totals[name]}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+class InstrumentationMiddleware:
+    """Measure every request; listed first so it sees all other middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed()
+        install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        response["Server-Timing"] = (
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.queries} queries", '
+            f"serialize;dur={metrics.serializer_time * 1000:.2f}, "
+            f"total;dur={duration * 1000:.2f}"
+        )
+        registry.observe(view, request.method, response.status_code, duration, metrics)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "view": view,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 2),
+                    "db_queries": metrics.queries,
+                    "db_ms": round(metrics.sql_time * 1000, 2),
+                    "serializer_ms": round(metrics.serializer_time * 1000, 2),
+                }
+            )
+        )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus metrics for staff users or a scraper sending ``METRICS_TOKEN``.
+
+    The token is sent as ``Authorization: Bearer <token>``; without a
+    ``METRICS_TOKEN`` setting only staff users get the metrics.
+    """
+    if not settings.INSTRUMENTATION_ENABLED:
+        raise Http404()
+    if not (request.user.is_staff or _has_metrics_token(request)):
+        raise PermissionDenied()
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _has_metrics_token(request):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return (
+        bool(settings.METRICS_TOKEN)
+        and scheme.lower() == "bearer"
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
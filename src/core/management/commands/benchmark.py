@@ -0,0 +1,139 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.urls import router
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency percentiles and query counts of every router endpoint "
+        "and compare them against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username to request as.")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="JSON file of an earlier run.")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative p95 increase over the baseline.",
+        )
+        parser.add_argument(
+            "--slack",
+            type=float,
+            default=2.0,
+            help="p95 increases below this many milliseconds are noise.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the response cache on instead of measuring the database path.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['user']}")
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if not options["cache"]:
+            overrides["RESPONSE_CACHE_TIMEOUT"] = 0
+        with override_settings(**overrides):
+            results = {
+                name: self.measure(user, path, options["iterations"])
+                for name, path in endpoints(user)
+            }
+        report = json.dumps(results, indent=4)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(report + "\n")
+        else:
+            self.stdout.write(report)
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            regressions = list(
+                compare(results, baseline, options["tolerance"], options["slack"])
+            )
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def measure(self, user, path, iterations):
+        client = Client()
+        client.force_login(user)
+        client.get(path)  # Warm up.
+        latencies = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - started)
+        result = {
+            "path": path,
+            "status": response.status_code,
+            "queries": len(queries),
+        }
+        for name, value in percentiles(latencies).items():
+            result[f"{name}_ms"] = round(value * 1000, 2)
+        return result
+
+
+def endpoints(user):
+    """Yield ``(name, path)`` for the list, detail and GET actions of the router."""
+    request = Request(APIRequestFactory().get("/"))
+    request.user = user
+    for _, viewset, basename in router.registry:
+        yield f"{basename}-list", reverse(f"{basename}-list")
+        view = viewset(request=request, format_kwarg=None, kwargs={})
+        view.action = "retrieve"
+        pk = view.get_queryset().order_by("pk").values_list("pk", flat=True).first()
+        if pk is None:
+            continue
+        yield f"{basename}-detail", reverse(f"{basename}-detail", args=[pk])
+        for action in viewset.get_extra_actions():
+            # Exports stream whole budgets and are left to the load test.
+            if (
+                action.detail
+                and "get" in action.mapping
+                and "(?P" not in action.url_path
+            ):
+                name = f"{basename}-{action.url_name}"
+                yield name, reverse(name, args=[pk])
+
+
+def percentiles(latencies):
+    if len(latencies) == 1:
+        return dict.fromkeys(("p50", "p95", "p99"), latencies[0])
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def compare(results, baseline, tolerance, slack=0):
+    """Yield a line for every endpoint that got slower or runs more queries."""
+    for name, expected in baseline.items():
+        result = results.get(name)
+        if result is None:
+            yield f"{name}: missing"
+            continue
+        if result["queries"] > expected["queries"]:
+            yield f"{name}: {result['queries']} queries, was {expected['queries']}"
+        limit = max(expected["p95_ms"] * (1 + tolerance), expected["p95_ms"] + slack)
+        if result["p95_ms"] > limit:
+            yield f"{name}: p95 {result['p95_ms']} ms, was {expected['p95_ms']} ms"
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import FORMATS, StatementImporter, guess_format, parse_statement
+from core.models import Budget
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or OFX bank statement into a budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the statement file.")
+        parser.add_argument("--budget", type=int, required=True, help="Budget id.")
+        parser.add_argument(
+            "--default-category",
+            required=True,
+            help="Category name for rows that match no rule.",
+        )
+        parser.add_argument(
+            "--rule",
+            action="append",
+            default=[],
+            metavar="PATTERN=CATEGORY",
+            help="Put rows whose description matches PATTERN into CATEGORY.",
+        )
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--encoding", default="utf-8")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            budget = Budget.objects.select_related("user").get(pk=options["budget"])
+        except Budget.DoesNotExist:
+            raise CommandError(f"Budget {options['budget']} does not exist.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        format = options["format"] or guess_format(options["path"])
+        if format is None:
+            raise CommandError("Cannot guess the statement format, use --format.")
+        rules = {}
+        for rule in options["rule"]:
+            pattern, separator, category = rule.rpartition("=")
+            if not separator:
+                raise CommandError(f"Invalid rule {rule!r}, use PATTERN=CATEGORY.")
+            rules[pattern] = category
+
+        try:
+            importer = StatementImporter(
+                budget,
+                options["default_category"],
+                rules=rules,
+                chunk_size=options["chunk_size"],
+            )
+            rows = parse_statement(options["path"], format, options["encoding"])
+            imported = importer.run(rows, on_progress=self.report_progress)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} entries."))
+
+    def report_progress(self, imported):
+        self.stdout.write(f"{imported} entries imported...")
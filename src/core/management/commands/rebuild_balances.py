@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import CategoryBalance
+
+
+class Command(BaseCommand):
+    help = "Recompute stored category balances from the financial entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report balances that differ from the entries.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            return self.check_balances()
+        rebuilt = CategoryBalance.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} balances."))
+
+    def check_balances(self):
+        inconsistent = 0
+        for category_id, stored, expected in CategoryBalance.inconsistencies():
+            inconsistent += 1
+            self.stdout.write(
+                f"Category {category_id}: stored {stored}, expected {expected}"
+            )
+        if inconsistent:
+            raise CommandError(f"{inconsistent} balances are inconsistent.")
+        self.stdout.write(self.style.SUCCESS("All balances are consistent."))
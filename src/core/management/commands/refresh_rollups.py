@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.models import MonthlyRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the monthly rollups of months changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild the rollups of every month, not only the changed ones.",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            refreshed = MonthlyRollup.rebuild()
+        else:
+            refreshed = MonthlyRollup.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} months."))
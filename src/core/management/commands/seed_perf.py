@@ -0,0 +1,155 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from rest_framework.authtoken.models import Token
+
+from core.factories.budget_factory import BudgetFactory
+from core.factories.user_factory import DEFAULT_PASSWORD, UserFactory
+from core.models import (
+    BudgetUser,
+    Category,
+    CategoryBalance,
+    FinancialEntry,
+    MonthlyRollup,
+)
+from core.utils import chunked
+
+
+class Command(BaseCommand):
+    help = "Generate users, budgets, categories, shares and entries for load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--budgets", type=int, default=2, help="Per user.")
+        parser.add_argument("--categories", type=int, default=8, help="Per budget.")
+        parser.add_argument("--shares", type=int, default=2, help="Per user.")
+        parser.add_argument("--entries", type=int, default=1_000_000, help="In total.")
+        parser.add_argument("--months", type=int, default=24, help="Date range.")
+        parser.add_argument("--prefix", default="perf", help="Username prefix.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        for option in ("users", "budgets", "categories", "batch_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1.")
+        self.random = random.Random(options["seed"])
+        self.faker = Faker()
+        self.faker.seed_instance(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        users = self.create_users(options["users"], options["prefix"])
+        budgets = self.create_budgets(users, options["budgets"])
+        categories = self.create_categories(budgets, options["categories"])
+        shares = self.create_shares(users, budgets, options["shares"])
+        entries = self.create_entries(categories, options["entries"], options["months"])
+        self.stdout.write("Building rollups.")
+        MonthlyRollup.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users)} users, {len(budgets)} budgets, "
+                f"{len(categories)} categories, {shares} shares and {entries} entries. "
+                f"Users log in as {options['prefix']}_<n> / {DEFAULT_PASSWORD}."
+            )
+        )
+
+    def create_users(self, count, prefix):
+        # Hashing is deliberately slow, so every user shares one hash.
+        password = make_password(DEFAULT_PASSWORD)
+        users = [
+            UserFactory.build(username=f"{prefix}_{number}", password=None)
+            for number in range(count)
+        ]
+        for user in users:
+            user.password = password
+        with transaction.atomic():
+            users = self.bulk_create(users)
+            Token.objects.bulk_create(
+                Token(key=Token.generate_key(), user=user) for user in users
+            )
+        return users
+
+    def create_budgets(self, users, per_user):
+        budgets = [
+            BudgetFactory.build(
+                user=user, name=f"{self.faker.word()} {number}", created_at=None
+            )
+            for user in users
+            for number in range(per_user)
+        ]
+        return self.bulk_create(budgets)
+
+    def create_categories(self, budgets, per_budget):
+        words = self.word_pool(per_budget)
+        categories = [
+            Category(user_id=budget.user_id, budget=budget, name=name)
+            for budget in budgets
+            for name in words
+        ]
+        categories = self.bulk_create(categories)
+        # Category.save() creates the balance, which bulk_create() skips.
+        self.bulk_create(
+            [CategoryBalance(category=category) for category in categories]
+        )
+        return categories
+
+    def create_shares(self, users, budgets, per_user):
+        """Share a budget of every user with ``per_user`` other users."""
+        budgets_by_user = {}
+        for budget in budgets:
+            budgets_by_user.setdefault(budget.user_id, []).append(budget)
+        others = per_user if len(users) > per_user else len(users) - 1
+        shares = [
+            BudgetUser(
+                owner=owner,
+                visitor=visitor,
+                budget=self.random.choice(budgets_by_user[owner.pk]),
+            )
+            for owner in users
+            for visitor in self.random.sample([u for u in users if u != owner], others)
+        ]
+        return len(self.bulk_create(shares))
+
+    def create_entries(self, categories, count, months):
+        descriptions = self.word_pool(200)
+        now = timezone.now()
+        span = int(timedelta(days=30 * months).total_seconds())
+
+        def entries():
+            for _ in range(count):
+                category = self.random.choice(categories)
+                yield FinancialEntry(
+                    user_id=category.user_id,
+                    category=category,
+                    amount=Decimal(self.random.randint(100, 50000)) / 100,
+                    description=self.random.choice(descriptions),
+                    entry_type=self.random.choice(
+                        (FinancialEntry.INCOME, FinancialEntry.EXPENSE)
+                    ),
+                    date=now - timedelta(seconds=self.random.randrange(span)),
+                )
+
+        created = 0
+        for batch in chunked(entries(), self.batch_size):
+            with transaction.atomic():
+                FinancialEntry.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f"{created}/{count} entries", ending="\r")
+        self.stdout.write("")
+        return created
+
+    def bulk_create(self, objs):
+        model = type(objs[0]) if objs else None
+        created = []
+        for batch in chunked(objs, self.batch_size):
+            created += model.objects.bulk_create(batch)
+        return created
+
+    def word_pool(self, size):
+        return self.faker.words(size, unique=size <= 500)
@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Entry indexes are built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("core", "0002_alter_financialentry_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="budget",
+            index=models.Index(
+                fields=["user", "-created_at"], name="budget_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="budgetuser",
+            index=models.Index(
+                fields=["visitor", "budget"], name="budgetuser_visitor_budget_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["budget", "name"], name="category_budget_name_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="financialentry",
+            index=models.Index(fields=["user", "-date"], name="entry_user_date_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="financialentry",
+            index=models.Index(
+                fields=["category", "-date", "-id"], name="entry_category_date_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="financialentry",
+            index=models.Index(
+                condition=models.Q(("entry_type", "Income")),
+                fields=["category", "-date", "-id"],
+                name="entry_income_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="financialentry",
+            index=models.Index(
+                condition=models.Q(("entry_type", "Expense")),
+                fields=["category", "-date", "-id"],
+                name="entry_expense_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+import django.db.models.deletion
+
+
+def compute_balances(apps, schema_editor):
+    Category = apps.get_model("core", "Category")
+    CategoryBalance = apps.get_model("core", "CategoryBalance")
+    categories = Category.objects.annotate(
+        income=Sum(
+            "financial_entries__amount",
+            filter=Q(financial_entries__entry_type="Income"),
+        ),
+        expense=Sum(
+            "financial_entries__amount",
+            filter=Q(financial_entries__entry_type="Expense"),
+        ),
+    ).values_list("pk", "income", "expense")
+    CategoryBalance.objects.bulk_create(
+        CategoryBalance(category_id=pk, income=income or 0, expense=expense or 0)
+        for pk, income, expense in categories.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_budget_budget_user_created_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryBalance",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="balance",
+                        serialize=False,
+                        to="core.category",
+                    ),
+                ),
+                (
+                    "income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "expense",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+        ),
+        migrations.RunPython(compute_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2 on 2026-10-18 17:27
+
+from django.db import migrations, models
+from django.db.models import DateField
+from django.db.models.functions import Trunc
+import django.db.models.deletion
+
+
+def mark_months_dirty(apps, schema_editor):
+    # The rollups are built by the first ``manage.py refresh_rollups`` run;
+    # until then reports read these months from the entries.
+    FinancialEntry = apps.get_model("core", "FinancialEntry")
+    DirtyMonth = apps.get_model("core", "DirtyMonth")
+    months = (
+        FinancialEntry.objects.annotate(
+            month=Trunc("date", "month", output_field=DateField())
+        )
+        .order_by()
+        .values_list("category", "month")
+        .distinct()
+    )
+    DirtyMonth.objects.bulk_create(
+        DirtyMonth(category_id=category_id, month=month)
+        for category_id, month in months.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_categorybalance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                (
+                    "entry_type",
+                    models.CharField(
+                        choices=[("Income", "Income"), ("Expense", "Expense")],
+                        max_length=10,
+                    ),
+                ),
+                ("total", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("count", models.PositiveIntegerField()),
+                (
+                    "budget",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.budget",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="core.category",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DirtyMonth",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="core.category",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="monthlyrollup",
+            index=models.Index(
+                fields=["budget", "month"], name="rollup_budget_month_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="monthlyrollup",
+            unique_together={("category", "month", "entry_type")},
+        ),
+        migrations.AlterUniqueTogether(
+            name="dirtymonth",
+            unique_together={("category", "month")},
+        ),
+        migrations.RunPython(mark_months_dirty, migrations.RunPython.noop),
+    ]
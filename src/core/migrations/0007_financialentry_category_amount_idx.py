@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("core", "0006_updated_at_tombstone"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="financialentry",
+            index=models.Index(
+                fields=["category", "amount"], name="entry_category_amount_idx"
+            ),
+        ),
+    ]
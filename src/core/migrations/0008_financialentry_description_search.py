@@ -0,0 +1,45 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+# Created on PostgreSQL only; other databases search descriptions with LIKE.
+SEARCH_INDEXES = [
+    # Same expression as ``core.models.DESCRIPTION_VECTOR``.
+    GinIndex(
+        SearchVector("description", config="simple"),
+        name="entry_description_search_idx",
+    ),
+    GinIndex(
+        OpClass("description", name="gin_trgm_ops"),
+        name="entry_description_trgm_idx",
+    ),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        model = apps.get_model("core", "FinancialEntry")
+        for index in SEARCH_INDEXES:
+            schema_editor.add_index(model, index, concurrently=True)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        model = apps.get_model("core", "FinancialEntry")
+        for index in SEARCH_INDEXES:
+            schema_editor.remove_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # The indexes are built concurrently, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("core", "0007_financialentry_category_amount_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
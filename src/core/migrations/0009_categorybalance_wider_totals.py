@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_financialentry_description_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="categorybalance",
+            name="expense",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name="categorybalance",
+            name="income",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
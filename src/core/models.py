@@ -1,34 +1,341 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateField,
+    DecimalField,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Trunc
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.utils import chunked
 
 # Create your models here.
 
+# Sent after bulk writes and deletes of entries with the ``category_ids``
+# they touched and, for deletes, ``deleted``: a ``{entry id: category id}``
+# dict. Deleted entries send no ``post_delete``, so Django deletes them in
+# one query instead of one signal per row.
+entries_changed = Signal()
+
+BILANCE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+# Descriptions are merchant names in any language, so words are not stemmed.
+# Must match the GIN index created in migration 0008.
+DESCRIPTION_VECTOR = SearchVector("description", config="simple")
+
+
+class BudgetQuerySet(models.QuerySet):
+    def shared_with(self, user):
+        """Budgets other users shared with ``user``."""
+        shared = BudgetUser.objects.filter(visitor=user).values("budget")
+        return self.filter(pk__in=shared)
+
+    def visible_to(self, user):
+        """Budgets ``user`` owns or has been given access to.
+
+        Shares are matched with a subquery instead of a join, so every
+        budget is returned once no matter how many visitors it has.
+        """
+        shared = BudgetUser.objects.filter(visitor=user).values("budget")
+        return self.filter(Q(user=user) | Q(pk__in=shared))
+
+    def with_bilance(self):
+        """Annotate each budget with the bilance of all its categories."""
+        balances = (
+            CategoryBalance.objects.filter(category__budget=OuterRef("pk"))
+            .order_by()
+            .values("category__budget")
+            .annotate(total=Sum(F("income") - F("expense")))
+            .values("total")
+        )
+        return self.annotate(
+            bilance_total=Coalesce(
+                Subquery(balances, output_field=BILANCE_FIELD),
+                Value(Decimal(0)),
+                output_field=BILANCE_FIELD,
+            )
+        )
+
 
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="budgets")
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BudgetQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], name="budget_user_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Budget: {self.name} ({self.user.username})"
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_bilance(self):
+        """Annotate each category with its incomes minus expenses.
+
+        Reads the stored ``CategoryBalance`` instead of the entries, so the
+        cost does not depend on how many entries a category has.
+        """
+        return self.annotate(
+            bilance_total=Coalesce(
+                F("balance__income") - F("balance__expense"),
+                Value(Decimal(0)),
+                output_field=BILANCE_FIELD,
+            )
+        )
+
+    AGGREGATES = ("latest_date", "total_amount", "bilance")
+
+    def alias_aggregates(self, *names):
+        """Alias the ``AGGREGATES`` in ``names`` to order categories by them.
+
+        ``latest_date`` is the date of the newest entry (``NULL`` without
+        entries), ``total_amount`` the sum of all amounts and ``bilance``
+        incomes minus expenses. None of them joins the entries: the totals
+        come from the stored ``CategoryBalance`` and the latest date from
+        one lookup on the ``(category, -date, -id)`` index per category.
+        """
+        aggregates = {
+            "latest_date": Subquery(
+                FinancialEntry.objects.filter(category=OuterRef("pk"))
+                .order_by("-date")
+                .values("date")[:1]
+            ),
+            "total_amount": Coalesce(
+                F("balance__income") + F("balance__expense"),
+                Value(Decimal(0)),
+                output_field=BILANCE_FIELD,
+            ),
+            "bilance": Coalesce(
+                F("balance__income") - F("balance__expense"),
+                Value(Decimal(0)),
+                output_field=BILANCE_FIELD,
+            ),
+        }
+        return self.alias(**{name: aggregates[name] for name in names})
+
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
     name = models.CharField(max_length=100)
     budget = models.ForeignKey(
         Budget, on_delete=models.CASCADE, related_name="categories"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["budget", "name"], name="category_budget_name_idx"),
+        ]
 
     def __str__(self):
         return f"Category: {self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "budget_id" in field_names:
+            instance._stored_budget_id = instance.budget_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                CategoryBalance.objects.create(category=self)
+            else:
+                # Rollups are selected by their denormalized budget.
+                self.monthly_rollups.exclude(budget_id=self.budget_id).update(
+                    budget_id=self.budget_id
+                )
+        self._stored_budget_id = self.budget_id
+
+
+class FinancialEntryQuerySet(models.QuerySet):
+    PERIODS = ("day", "month", "year")
+
+    def totals(self, period):
+        """Sum and count entries per category, entry type and ``period``.
+
+        Runs as a single ``GROUP BY``; ``period`` is one of ``PERIODS``.
+        """
+        return (
+            self.order_by()
+            .annotate(period=Trunc("date", period, output_field=DateField()))
+            .values("category", "category__name", "entry_type", "period")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by("period", "category__name", "entry_type")
+        )
+
+    def balances(self, *fields):
+        """Income and expense totals per category (and ``fields``), from the entries."""
+        return (
+            self.order_by()
+            .values("category", *fields)
+            .annotate(
+                income=Coalesce(
+                    Sum("amount", filter=Q(entry_type=FinancialEntry.INCOME)),
+                    Value(Decimal(0)),
+                    output_field=BILANCE_FIELD,
+                ),
+                expense=Coalesce(
+                    Sum("amount", filter=Q(entry_type=FinancialEntry.EXPENSE)),
+                    Value(Decimal(0)),
+                    output_field=BILANCE_FIELD,
+                ),
+            )
+        )
+
+    def search(self, text):
+        """Entries whose description matches ``text``.
+
+        On PostgreSQL the words (web search syntax: ``"phrase"``, ``or``,
+        ``-word``) are matched against the GIN-indexed ``tsvector`` of the
+        description, and misspelled or partial merchant names by trigram
+        word similarity. Other databases fall back to a case-insensitive
+        ``LIKE`` per word.
+        """
+        if connections[self.db].vendor != "postgresql":
+            words = text.split()
+            return self.filter(*[Q(description__icontains=word) for word in words])
+        return self.alias(search=DESCRIPTION_VECTOR).filter(
+            Q(search=_search_query(text)) | Q(description__trigram_word_similar=text)
+        )
+
+    def by_relevance(self, text):
+        """Order by how well the description matches ``text``, then newest first.
+
+        Only PostgreSQL ranks; other databases order newest first.
+        """
+        if connections[self.db].vendor != "postgresql":
+            return self.order_by("-date", "-id")
+        rank = SearchRank(DESCRIPTION_VECTOR, _search_query(text))
+        return self.annotate(
+            rank=rank + TrigramWordSimilarity(text, "description")
+        ).order_by("-rank", "-date", "-id")
+
+    def locked_states(self, pks):
+        """Lock the rows ``pks`` and map each one still stored to its ``EntryState``.
+
+        Balance changes are computed from these rows rather than from
+        instances loaded earlier in the request, which a concurrent write
+        may have changed or deleted since.
+        """
+        rows = (
+            self.model.objects.using(self.db)
+            .select_for_update(of=("self",))
+            .filter(pk__in=pks)
+            .order_by()
+            .only("category_id", "entry_type", "amount", "date")
+        )
+        return {entry.pk: entry.state for entry in rows}
+
+    # Bulk writes skip ``FinancialEntry.save()`` and ``delete()``, so they
+    # keep the stored balances and rollups up to date themselves.
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._track_changes(added=[entry.state for entry in objs])
+        for entry in objs:
+            entry._stored_state = entry.state
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # ``auto_now`` is only applied by ``save()``.
+        now = timezone.now()
+        for entry in objs:
+            entry.updated_at = now
+        fields = list(dict.fromkeys([*fields, "updated_at"]))
+        with transaction.atomic(using=self.db):
+            stored = self.locked_states([entry.pk for entry in objs])
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            self._track_changes(
+                removed=list(stored.values()),
+                added=[entry.state for entry in objs if entry.pk in stored],
+            )
+        for entry in objs:
+            entry._stored_state = entry.state
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            # Only the rows locked here are deleted and removed from the
+            # balances, not rows a concurrent delete has already removed.
+            locked = self.order_by().select_for_update(of=("self",))
+            deleted = dict(locked.values_list("pk", "category"))
+            entries = self.model.objects.using(self.db).filter(pk__in=deleted)
+            months = entries.annotate(
+                month=Trunc("date", "month", output_field=DateField())
+            )
+            removed = []
+            for row in months.balances("month"):
+                for entry_type, amount in (
+                    (FinancialEntry.INCOME, row["income"]),
+                    (FinancialEntry.EXPENSE, row["expense"]),
+                ):
+                    removed.append(
+                        EntryState(row["category"], entry_type, amount, row["month"])
+                    )
+            self._track_changes(removed=removed, deleted=deleted)
+            return super(FinancialEntryQuerySet, entries).delete()
+
+    def _track_changes(self, removed=(), added=(), deleted=None):
+        track_entry_changes(removed, added)
+        category_ids = {state.category_id for state in [*removed, *added]}
+        entries_changed.send(
+            sender=self.model,
+            category_ids=category_ids | set((deleted or {}).values()),
+            deleted=deleted or {},
+        )
+
+
+def _search_query(text):
+    return SearchQuery(text, config="simple", search_type="websearch")
+
+
+class EntryState(NamedTuple):
+    """What an entry contributes to the stored balances and rollups."""
+
+    category_id: int
+    entry_type: str
+    amount: Decimal
+    month: date
+
 
 class FinancialEntry(models.Model):
     INCOME = "Income"
@@ -48,13 +355,85 @@ class FinancialEntry(models.Model):
     description = models.TextField()
     date = models.DateTimeField()
     entry_type = models.CharField(max_length=10, choices=ENTRY_TYPES)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = FinancialEntryQuerySet.as_manager()
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["user", "-date"], name="entry_user_date_idx"),
+            models.Index(
+                fields=["category", "-date", "-id"], name="entry_category_date_idx"
+            ),
+            models.Index(
+                fields=["category", "amount"], name="entry_category_amount_idx"
+            ),
+            models.Index(
+                fields=["category", "-date", "-id"],
+                name="entry_income_idx",
+                condition=Q(entry_type="Income"),
+            ),
+            models.Index(
+                fields=["category", "-date", "-id"],
+                name="entry_expense_idx",
+                condition=Q(entry_type="Expense"),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.entry_type}: {self.amount} ({self.date})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {"category_id", "entry_type", "amount", "date"}.issubset(field_names):
+            instance._stored_state = instance.state
+        return instance
+
+    @property
+    def state(self):
+        amount = self._meta.get_field("amount").to_python(self.amount)
+        moment = self._meta.get_field("date").to_python(self.date)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        month = timezone.localtime(moment).date().replace(day=1)
+        return EntryState(self.category_id, self.entry_type, amount, month)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self._state.adding:
+                stored = FinancialEntry.objects.locked_states([self.pk])
+                self._stored_state = stored.get(self.pk)
+            old_state = getattr(self, "_stored_state", None)
+            super().save(*args, **kwargs)
+            if old_state != self.state:
+                track_entry_changes(
+                    removed=[old_state] if old_state else [], added=[self.state]
+                )
+        self._stored_state = self.state
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            state = FinancialEntry.objects.locked_states([self.pk]).get(self.pk)
+            if state is None:
+                # Already deleted by a concurrent request.
+                return 0, {}
+            track_entry_changes(removed=[state])
+            entries_changed.send(
+                sender=FinancialEntry,
+                category_ids={self.category_id},
+                deleted={self.pk: self.category_id},
+            )
+            return super().delete(*args, **kwargs)
+
+
+def track_entry_changes(removed=(), added=()):
+    """Update balances and mark rollups dirty for removed and added entry states."""
+    CategoryBalance.apply(removed, sign=-1)
+    CategoryBalance.apply(added)
+    DirtyMonth.mark([*removed, *added])
+
 
 class BudgetUser(models.Model):
     owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, related_name="owners")
@@ -64,10 +443,291 @@ class BudgetUser(models.Model):
     budget = models.ForeignKey(
         Budget, on_delete=models.DO_NOTHING, related_name="shared_with_users"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("owner", "visitor")
         ordering = ["owner", "visitor"]
+        indexes = [
+            models.Index(
+                fields=["visitor", "budget"], name="budgetuser_visitor_budget_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.owner.username} shared {self.budget.name} to {self.visitor.username}"
+
+
+class CategoryBalance(models.Model):
+    """Running income and expense totals of a category.
+
+    Kept up to date by every write to ``FinancialEntry`` in the same
+    transaction; ``manage.py rebuild_balances`` recomputes it from scratch.
+    """
+
+    category = models.OneToOneField(
+        Category, on_delete=models.CASCADE, primary_key=True, related_name="balance"
+    )
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Balance of {self.category_id}: {self.bilance}"
+
+    @property
+    def bilance(self):
+        return self.income - self.expense
+
+    @classmethod
+    def apply(cls, states, sign=1):
+        """Add (or with ``sign=-1`` remove) ``EntryState`` amounts."""
+        totals = defaultdict(lambda: {"income": Decimal(0), "expense": Decimal(0)})
+        for category_id, entry_type, amount, _ in states:
+            if entry_type == FinancialEntry.INCOME:
+                totals[category_id]["income"] += amount
+            elif entry_type == FinancialEntry.EXPENSE:
+                totals[category_id]["expense"] += amount
+        totals = {
+            category_id: deltas
+            for category_id, deltas in totals.items()
+            if any(deltas.values())
+        }
+        if not totals:
+            return
+        # One UPDATE for all touched categories, whatever the batch size.
+        changes = {}
+        for field in ("income", "expense"):
+            whens = [
+                When(category_id=category_id, then=F(field) + sign * deltas[field])
+                for category_id, deltas in totals.items()
+                if deltas[field]
+            ]
+            if whens:
+                changes[field] = Case(
+                    *whens, default=F(field), output_field=BILANCE_FIELD
+                )
+        balances = cls.objects.filter(category_id__in=totals)
+        if balances.update(**changes) < len(totals):
+            existing = set(balances.values_list("category_id", flat=True))
+            cls.objects.bulk_create(
+                cls(
+                    category_id=category_id,
+                    income=sign * deltas["income"],
+                    expense=sign * deltas["expense"],
+                )
+                for category_id, deltas in totals.items()
+                if category_id not in existing
+            )
+
+    @classmethod
+    def expected(cls):
+        """Map every category id to the ``(income, expense)`` its entries add up to."""
+        expected = dict.fromkeys(
+            Category.objects.values_list("pk", flat=True), (Decimal(0), Decimal(0))
+        )
+        for row in FinancialEntry.objects.balances():
+            expected[row["category"]] = (row["income"], row["expense"])
+        return expected
+
+    @classmethod
+    def inconsistencies(cls):
+        """Yield ``(category id, stored, expected)`` for every wrong balance."""
+        stored = {
+            balance.category_id: (balance.income, balance.expense)
+            for balance in cls.objects.all()
+        }
+        for category_id, totals in cls.expected().items():
+            if stored.get(category_id, (Decimal(0), Decimal(0))) != totals:
+                yield category_id, stored.get(category_id), totals
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every balance from the entries and return how many were written."""
+        balances = [
+            cls(category_id=category_id, income=income, expense=expense)
+            for category_id, (income, expense) in cls.expected().items()
+        ]
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                balances,
+                update_conflicts=True,
+                unique_fields=["category"],
+                update_fields=["income", "expense"],
+            )
+        return len(balances)
+
+
+class MonthlyRollup(models.Model):
+    """Sum and count of a category's entries of one type in one month.
+
+    Only trustworthy for months without a ``DirtyMonth`` marker;
+    ``manage.py refresh_rollups`` recomputes the marked months.
+    """
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name="+")
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="monthly_rollups"
+    )
+    month = models.DateField()
+    entry_type = models.CharField(max_length=10, choices=FinancialEntry.ENTRY_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("category", "month", "entry_type")
+        indexes = [
+            models.Index(fields=["budget", "month"], name="rollup_budget_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_type} {self.month:%Y-%m}: {self.total} ({self.count})"
+
+    @classmethod
+    def refresh(cls, batch_size=500):
+        """Recompute the rollups of every dirty month; return how many were refreshed."""
+        refreshed = 0
+        while True:
+            with transaction.atomic():
+                dirty = list(
+                    DirtyMonth.objects.select_for_update()
+                    .order_by("pk")
+                    .values_list("pk", "category_id", "month")[:batch_size]
+                )
+                if not dirty:
+                    return refreshed
+                DirtyMonth.objects.filter(pk__in=[pk for pk, _, _ in dirty]).delete()
+                for _, category_id, month in dirty:
+                    cls.refresh_month(category_id, month)
+                refreshed += len(dirty)
+
+    @classmethod
+    def refresh_month(cls, category_id, month):
+        cls.objects.filter(category_id=category_id, month=month).delete()
+        start = timezone.make_aware(datetime.combine(month, time.min))
+        end = timezone.make_aware(datetime.combine(_next_month(month), time.min))
+        totals = (
+            FinancialEntry.objects.filter(
+                category_id=category_id, date__gte=start, date__lt=end
+            )
+            .order_by()
+            .values("category__budget", "entry_type")
+            .annotate(total=Sum("amount"), count=Count("id"))
+        )
+        cls.objects.bulk_create(
+            cls(
+                budget_id=row["category__budget"],
+                category_id=category_id,
+                month=month,
+                entry_type=row["entry_type"],
+                total=row["total"],
+                count=row["count"],
+            )
+            for row in totals
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the rollups of every month with one aggregate over the entries.
+
+        Returns how many category months were written.
+        """
+        totals = (
+            FinancialEntry.objects.annotate(
+                month=Trunc("date", "month", output_field=DateField())
+            )
+            .order_by()
+            .values("category__budget", "category", "month", "entry_type")
+            .annotate(total=Sum("amount"), count=Count("id"))
+        )
+        months = set()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            DirtyMonth.objects.all().delete()
+            rollups = (
+                cls(
+                    budget_id=row["category__budget"],
+                    category_id=row["category"],
+                    month=row["month"],
+                    entry_type=row["entry_type"],
+                    total=row["total"],
+                    count=row["count"],
+                )
+                for row in totals.iterator()
+            )
+            for batch in chunked(rollups, 1000):
+                cls.objects.bulk_create(batch)
+                months.update((rollup.category_id, rollup.month) for rollup in batch)
+        return len(months)
+
+
+class DirtyMonth(models.Model):
+    """A category month whose ``MonthlyRollup`` rows are out of date."""
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+    month = models.DateField()
+
+    class Meta:
+        unique_together = ("category", "month")
+
+    def __str__(self):
+        return f"{self.category_id} {self.month:%Y-%m}"
+
+    @classmethod
+    def mark(cls, states):
+        months = {(state.category_id, state.month) for state in states}
+        # An upsert rather than ``ignore_conflicts``: it locks an existing
+        # marker until the writer commits, so ``MonthlyRollup.refresh``
+        # cannot delete it and sum the month without the uncommitted entries.
+        cls.objects.bulk_create(
+            (
+                cls(category_id=category_id, month=month)
+                for category_id, month in months
+            ),
+            update_conflicts=True,
+            unique_fields=["category", "month"],
+            update_fields=["month"],
+        )
+
+
+def _next_month(month):
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class Tombstone(models.Model):
+    """Records a deleted row so that ``/sync/`` can report the deletion.
+
+    Tombstones of categories and entries are seen by everyone who can see
+    ``budget_id``. Deleted budgets, lost shares and deleted shares are
+    recorded once per affected ``user`` instead, since the budget they
+    belonged to may be gone.
+    """
+
+    BUDGET = "budget"
+    CATEGORY = "category"
+    FINANCIAL_ENTRY = "financial_entry"
+    BUDGET_USER = "budget_user"
+
+    MODELS = (
+        (BUDGET, "Budget"),
+        (CATEGORY, "Category"),
+        (FINANCIAL_ENTRY, "Financial entry"),
+        (BUDGET_USER, "Budget user"),
+    )
+    model = models.CharField(max_length=20, choices=MODELS)
+    object_id = models.BigIntegerField()
+    budget_id = models.BigIntegerField(null=True, blank=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["budget_id", "deleted_at"], name="tombstone_budget_idx"
+            ),
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
@@ -0,0 +1,28 @@
+"""Migration operations for the large tables."""
+from django.contrib.postgres import operations as postgres
+from django.db import migrations
+
+
+class AddIndexConcurrently(postgres.AddIndexConcurrently):
+    """Build the index without blocking writes on PostgreSQL.
+
+    Other databases, which have no ``CREATE INDEX CONCURRENTLY``, get a
+    plain ``AddIndex``. As with Django's operation the migration needs
+    ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,94 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class FinancialEntryCursorPagination(CursorPagination):
+    """Keyset pagination over ``(date, id)``.
+
+    A cursor holds the date and id of the entry a page starts after, and
+    the page is selected with ``WHERE date < :date OR (date = :date AND
+    id < :id)`` instead of ``OFFSET``, so deep pages cost the same as the
+    first one, also when thousands of imported entries share a date. DRF's
+    ``CursorPagination`` only keeps the first ordering field and skips
+    entries with an equal one by offset.
+    """
+
+    ordering = ("-date", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by("date", "id")
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            date, pk = self.parse_position(current_position)
+            if reverse:
+                after = Q(date__gt=date) | Q(date=date, id__gt=pk)
+            else:
+                after = Q(date__lt=date) | Q(date=date, id__lt=pk)
+            queryset = queryset.filter(after)
+
+        # Positions are unique, so links never carry an offset; it is only
+        # honoured for cursors made by hand.
+        results = list(queryset[offset : offset + self.page_size + 1])
+        self.page = results[: self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            date, pk = instance["date"], instance["id"]
+        else:
+            date, pk = instance.date, instance.pk
+        return f"{date.isoformat()}|{pk}"
+
+    def parse_position(self, position):
+        try:
+            date, pk = position.split("|")
+            date, pk = parse_datetime(date), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date, pk
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """Numbered pages for results ordered by relevance, which cursors cannot page."""
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
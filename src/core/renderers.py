@@ -0,0 +1,78 @@
+"""JSON rendering and parsing with orjson.
+
+``ORJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer``:
+amounts and dates already arrive as strings from the serializers, raw
+datetimes get the same ``Z`` suffix, and any other type goes through DRF's
+``JSONEncoder.default``. Output DRF formats differently (indented, ASCII
+only or non-compact JSON, e.g. the browsable API) and data orjson cannot
+encode, like integers beyond 64 bits, fall back to ``JSONRenderer``, as
+does everything when orjson is not installed. The one known difference is
+the exponent of very large or small floats, including raw ``Decimal``
+values, which DRF turns into floats: orjson writes ``1e16`` where ``json``
+writes ``1e+16``. No endpoint renders raw floats.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+# orjson reads integers beyond 64 bits as floats, json keeps them exact.
+# Runs of 20 digits are found by mapping every digit to "0", which is much
+# faster than a regular expression on large bodies.
+DIGITS = bytes.maketrans(b"123456789", b"000000000")
+LONG_NUMBER = b"0" * 20
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render compact UTF-8 JSON with orjson, anything else like ``JSONRenderer``."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or indent is not None
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, to stay a strict JavaScript subset.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class ORJSONParser(JSONParser):
+    """Parse UTF-8 JSON with orjson, anything else like ``JSONParser``."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        utf8 = encoding.lower().replace("-", "") == "utf8"
+        if orjson is None or not utf8 or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        content = stream.read()
+        if LONG_NUMBER in content.translate(DIGITS):
+            return super().parse(io.BytesIO(content), media_type, parser_context)
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Let json report the error, or parse what orjson refuses.
+            return super().parse(io.BytesIO(content), media_type, parser_context)
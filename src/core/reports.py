@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import DateField, Exists, OuterRef, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from core.models import DirtyMonth, FinancialEntry, MonthlyRollup
+
+
+def budget_summary(budget, period="month", date_from=None, date_to=None):
+    """Totals per category, entry type and ``period`` between two dates.
+
+    Closed months lying fully inside the range are read from
+    ``MonthlyRollup`` unless they are marked dirty; the current month, the
+    partial months at the edges and dirty months are summed from the entries.
+    """
+    rollups, entries = summary_queries(budget, period, date_from, date_to)
+    return merge_summary(period, rollups, entries)
+
+
+async def abudget_summary(budget, period="month", date_from=None, date_to=None):
+    """Async version of ``budget_summary``."""
+    rollups, entries = summary_queries(budget, period, date_from, date_to)
+    rollups = [row async for row in rollups]
+    entries = [row async for row in entries]
+    return merge_summary(period, rollups, entries)
+
+
+def summary_queries(budget, period, date_from=None, date_to=None):
+    """Return the rollup rows and the entry totals that make up a summary."""
+    rollups = MonthlyRollup.objects.none()
+    entries = FinancialEntry.objects.filter(category__budget=budget)
+    if date_from is not None:
+        entries = entries.filter(date__gte=_start_of_day(date_from))
+    if date_to is not None:
+        entries = entries.filter(date__lt=_start_of_day(date_to + timedelta(days=1)))
+    if period == "day":
+        return rollups, entries.totals(period)
+
+    # Rollups cover the months in [first_month, last_month).
+    first_month = date_from and _month_floor(date_from)
+    if date_from is not None and date_from.day != 1:
+        first_month = _next_month(first_month)
+    last_month = _month_floor(timezone.localdate())
+    if date_to is not None:
+        last_month = min(last_month, _month_floor(date_to + timedelta(days=1)))
+    if first_month is not None and first_month >= last_month:
+        return rollups, entries.totals(period)
+
+    dirty = DirtyMonth.objects.filter(
+        category=OuterRef("category"), month=OuterRef("month")
+    )
+    rollups = MonthlyRollup.objects.filter(budget=budget, month__lt=last_month)
+    entries = entries.annotate(month=Trunc("date", "month", output_field=DateField()))
+    live = Q(date__gte=_start_of_day(last_month)) | Q(Exists(dirty))
+    if first_month is not None:
+        rollups = rollups.filter(month__gte=first_month)
+        live |= Q(date__lt=_start_of_day(first_month))
+    rollups = rollups.filter(~Exists(dirty)).values(
+        "category", "category__name", "entry_type", "month", "total", "count"
+    )
+    return rollups, entries.filter(live).totals(period)
+
+
+def merge_summary(period, rollups, entries):
+    rows = defaultdict(lambda: {"total": 0, "count": 0})
+    for row in rollups:
+        start = row["month"] if period == "month" else row["month"].replace(month=1)
+        _add(rows, row, start)
+    for row in entries:
+        _add(rows, row, row["period"])
+    return sorted(
+        rows.values(),
+        key=lambda row: (row["period"], row["category__name"], row["entry_type"]),
+    )
+
+
+def _add(rows, row, period):
+    key = (period, row["category"], row["entry_type"])
+    summary = rows[key]
+    summary.update(
+        category=row["category"],
+        category__name=row["category__name"],
+        entry_type=row["entry_type"],
+        period=period,
+    )
+    summary["total"] += row["total"]
+    summary["count"] += row["count"]
+
+
+def _month_floor(day):
+    return day.replace(day=1)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
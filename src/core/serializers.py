@@ -3,14 +3,23 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
-from core.fields import EntriesBilanceField
-from core.models import Budget, BudgetUser, Category, FinancialEntry
+from core.fields import BatchHyperlinkedRelatedField, EntriesBilanceField
+from core.importers import FORMATS, guess_format
+from core.models import (
+    Budget,
+    BudgetUser,
+    Category,
+    FinancialEntry,
+    FinancialEntryQuerySet,
+)
+from core.sync import decode_token
 
 
 class FinancialEntrySerializer(serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name="financial-entries-detail")
     category = serializers.HyperlinkedRelatedField(
-        queryset=Category.objects.all(), view_name="categories-detail"
+        queryset=Category.objects.select_related("budget"),
+        view_name="categories-detail",
     )
 
     class Meta:
@@ -18,11 +27,59 @@ class FinancialEntrySerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def validate(self, attrs):
-        if attrs["category"].budget.user != self.context["request"].user:
+        if attrs["category"].budget.user_id != self.context["request"].user.id:
             raise ValidationError("This budget doesn't belong to you.")
         return attrs
 
 
+class FinancialEntryListSerializer(serializers.ListSerializer):
+    """Validates and writes a batch of entries with a constant number of queries."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload_categories(data)
+        return super().to_internal_value(data)
+
+    def preload_categories(self, data):
+        field = self.child.fields["category"]
+        lookup_values = {
+            field.get_lookup_value(item.get("category"))
+            for item in data
+            if isinstance(item, dict)
+        }
+        pks = [value for value in lookup_values if value and value.isdigit()]
+        self.context[field.batch_key] = {
+            str(pk): category
+            for pk, category in field.get_queryset().in_bulk(pks).items()
+        }
+
+    def create(self, validated_data):
+        return FinancialEntry.objects.bulk_create(
+            FinancialEntry(**attrs) for attrs in validated_data
+        )
+
+    def update(self, instances, validated_data):
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+        FinancialEntry.objects.bulk_update(instances, fields)
+        return instances
+
+
+class BulkFinancialEntrySerializer(FinancialEntrySerializer):
+    category = BatchHyperlinkedRelatedField(
+        batch_key="categories",
+        queryset=Category.objects.select_related("budget"),
+        view_name="categories-detail",
+    )
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(FinancialEntrySerializer.Meta):
+        list_serializer_class = FinancialEntryListSerializer
+
+
 class FinancialEntryInCategorySerializer(serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name="financial-entries-detail")
 
@@ -47,11 +104,32 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ("budget", "name", "financial_entries", "bilance", "url")
 
     def validate(self, attrs):
-        if attrs["budget"].user != self.context["request"].user:
+        if attrs["budget"].user_id != self.context["request"].user.id:
             raise ValidationError("This budget doesn't belong to you.")
         return attrs
 
 
+class CategoryCompactSerializer(serializers.ModelSerializer):
+    """Category without its entries, for ``?compact=true``."""
+
+    budget = serializers.HyperlinkedRelatedField(
+        read_only=True, view_name="budgets-detail"
+    )
+    bilance = EntriesBilanceField(source="financial_entries", read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ("id", "name", "budget", "bilance")
+
+
+class CategoryQuerySerializer(serializers.Serializer):
+    compact = serializers.BooleanField(default=False)
+
+
+class FinancialEntrySearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+
+
 class BudgetUsersInBudgetSerializer(serializers.ModelSerializer):
     visitor = serializers.HyperlinkedRelatedField(
         view_name="users-detail", read_only=True
@@ -144,3 +222,57 @@ class BudgetUserSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
     # 5?NUFZ^3#6fNw2+
+
+
+class BudgetSummaryQuerySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(
+        choices=FinancialEntryQuerySet.PERIODS, default="month"
+    )
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_from, date_to = attrs.get("date_from"), attrs.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError("date_from must not be after date_to.")
+        return attrs
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False)
+
+    def validate_since(self, value):
+        try:
+            return decode_token(value)
+        except (ValueError, OverflowError):
+            raise ValidationError("Invalid sync token.")
+
+
+class BudgetSummarySerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    category_name = serializers.CharField(source="category__name")
+    entry_type = serializers.CharField()
+    period = serializers.DateField()
+    total = serializers.DecimalField(max_digits=None, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class StatementImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+    default_category = serializers.CharField()
+    rules = serializers.JSONField(binary=True, required=False, default=dict)
+    chunk_size = serializers.IntegerField(min_value=1, max_value=10000, default=1000)
+
+    def validate_rules(self, value):
+        if not isinstance(value, dict) or not all(
+            isinstance(item, str) for item in (*value.keys(), *value.values())
+        ):
+            raise ValidationError("Expected an object mapping patterns to categories.")
+        return value
+
+    def validate(self, attrs):
+        attrs.setdefault("format", guess_format(attrs["file"].name))
+        if attrs["format"] is None:
+            raise ValidationError({"format": ["Cannot guess the statement format."]})
+        return attrs
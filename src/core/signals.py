@@ -1,10 +1,202 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
+from core.cache import invalidate_users
+from core.models import (
+    Budget,
+    BudgetUser,
+    Category,
+    FinancialEntry,
+    Tombstone,
+    entries_changed,
+)
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_auth_token(sender, instance=None, created=False, **kwargs):
-    if created:
+def create_auth_token(sender, instance=None, created=False, raw=False, **kwargs):
+    if created and not raw:
         Token.objects.create(user=instance)
+
+
+def budget_audience(budgets):
+    """Ids of the owners and visitors of ``budgets`` (ids or a values query)."""
+    owners = Budget.objects.filter(pk__in=budgets).order_by()
+    visitors = BudgetUser.objects.filter(budget__in=budgets).order_by()
+    owners = owners.values_list("user", flat=True)
+    visitors = visitors.values_list("visitor", flat=True)
+    return set(owners.union(visitors))
+
+
+def invalidate(user_ids):
+    # Invalidate right away and once more after commit, so that a response
+    # cached from data read before the commit is not served afterwards.
+    user_ids = set(user_ids)
+    invalidate_users(user_ids)
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user(sender, instance, **kwargs):
+    # User ids can be reused, a new user must not see an old user's responses.
+    invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def invalidate_budget(sender, instance, **kwargs):
+    invalidate({instance.user_id} | budget_audience([instance.pk]))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    invalidate(budget_audience([instance.budget_id]))
+
+
+@receiver(post_save, sender=FinancialEntry)
+def invalidate_entry(sender, instance, **kwargs):
+    # ``_stored_state`` still describes the entry before this save.
+    stored = getattr(instance, "_stored_state", None)
+    category_ids = {instance.category_id, stored and stored.category_id} - {None}
+    invalidate_entry_categories(sender, category_ids=category_ids)
+
+
+@receiver(entries_changed, sender=FinancialEntry)
+def invalidate_entry_categories(sender, category_ids, **kwargs):
+    budgets = Category.objects.filter(pk__in=category_ids).values("budget")
+    invalidate(budget_audience(budgets))
+
+
+@receiver(post_save, sender=BudgetUser)
+@receiver(post_delete, sender=BudgetUser)
+def invalidate_budget_user(sender, instance, **kwargs):
+    invalidate(
+        {instance.owner_id, instance.visitor_id} | budget_audience([instance.budget_id])
+    )
+
+
+# ``/sync/`` returns categories with their bilance, and budgets with their
+# categories and shares, so those rows change along with them.
+
+
+@receiver(post_save, sender=FinancialEntry)
+def touch_entry_category(sender, instance, **kwargs):
+    stored = getattr(instance, "_stored_state", None)
+    category_ids = {instance.category_id, stored and stored.category_id} - {None}
+    touch_entry_categories(sender, category_ids=category_ids)
+
+
+@receiver(entries_changed, sender=FinancialEntry)
+def touch_entry_categories(sender, category_ids, **kwargs):
+    Category.objects.filter(pk__in=category_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def touch_category_budget(sender, instance, **kwargs):
+    stored = getattr(instance, "_stored_budget_id", None)
+    budget_ids = {instance.budget_id, stored} - {None}
+    Budget.objects.filter(pk__in=budget_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=BudgetUser)
+@receiver(post_delete, sender=BudgetUser)
+def touch_shared_budget(sender, instance, **kwargs):
+    Budget.objects.filter(pk=instance.budget_id).update(updated_at=timezone.now())
+
+
+# Tombstones for ``/sync/``.
+
+
+@receiver(post_delete, sender=Budget)
+def bury_budget(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=Tombstone.BUDGET,
+        object_id=instance.pk,
+        budget_id=instance.pk,
+        user_id=instance.user_id,
+    )
+
+
+@receiver(post_delete, sender=Category)
+def bury_category(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=Tombstone.CATEGORY, object_id=instance.pk, budget_id=instance.budget_id
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def bury_category_entries(sender, instance, **kwargs):
+    # Entries are deleted by the cascade without signals, see ``entries_changed``.
+    entries = FinancialEntry.objects.filter(category=instance)
+    Tombstone.objects.bulk_create(
+        Tombstone(
+            model=Tombstone.FINANCIAL_ENTRY,
+            object_id=pk,
+            budget_id=instance.budget_id,
+        )
+        for pk in entries.values_list("pk", flat=True)
+    )
+
+
+@receiver(entries_changed, sender=FinancialEntry)
+def bury_entries(sender, deleted=None, **kwargs):
+    if not deleted:
+        return
+    budgets = dict(
+        Category.objects.filter(pk__in=set(deleted.values())).values_list(
+            "pk", "budget"
+        )
+    )
+    Tombstone.objects.bulk_create(
+        Tombstone(
+            model=Tombstone.FINANCIAL_ENTRY,
+            object_id=pk,
+            budget_id=budgets.get(category_id),
+        )
+        for pk, category_id in deleted.items()
+    )
+
+
+@receiver(post_save, sender=FinancialEntry)
+def bury_moved_entry(sender, instance, created, **kwargs):
+    # An entry moved to another budget is gone for the old budget's visitors.
+    stored = getattr(instance, "_stored_state", None)
+    if created or not stored or stored.category_id == instance.category_id:
+        return
+    budgets = dict(
+        Category.objects.filter(
+            pk__in=[stored.category_id, instance.category_id]
+        ).values_list("pk", "budget")
+    )
+    old_budget = budgets.get(stored.category_id)
+    if old_budget != budgets.get(instance.category_id):
+        Tombstone.objects.create(
+            model=Tombstone.FINANCIAL_ENTRY, object_id=instance.pk, budget_id=old_budget
+        )
+
+
+@receiver(post_delete, sender=BudgetUser)
+def bury_budget_user(sender, instance, **kwargs):
+    # The visitor lost access to the whole budget.
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(
+                model=Tombstone.BUDGET_USER,
+                object_id=instance.pk,
+                budget_id=instance.budget_id,
+                user_id=instance.owner_id,
+            ),
+            Tombstone(
+                model=Tombstone.BUDGET,
+                object_id=instance.budget_id,
+                budget_id=instance.budget_id,
+                user_id=instance.visitor_id,
+            ),
+        ]
+    )
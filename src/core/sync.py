@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Budget, BudgetUser, Tombstone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Rows are stamped before their transaction commits, so a token is issued
+# no later than the start of the oldest write transaction still open, which
+# may be a long statement import, and reaches a little further into the
+# past for clock skew between the app servers and the database.
+# Clients may receive a row twice and must apply changes idempotently.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def encode_token(moment):
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_token(token):
+    return EPOCH + timedelta(microseconds=int(token))
+
+
+def oldest_open_write():
+    """Start of the oldest other transaction that wrote and has not committed.
+
+    Only known on PostgreSQL; ``None`` when there is none or elsewhere.
+    """
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT min(xact_start) FROM pg_stat_activity"
+            " WHERE backend_xid IS NOT NULL AND datname = current_database()"
+            " AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+class Changes:
+    """Rows that ``user`` can see and that changed after ``since``.
+
+    Without ``since`` every visible row is returned. Budgets shared with the
+    user after ``since`` are returned whole, however old their rows are.
+    """
+
+    def __init__(self, user, since=None):
+        self.user = user
+        self.since = since
+        issued = timezone.now()
+        oldest_write = oldest_open_write()
+        if oldest_write is not None:
+            issued = min(issued, oldest_write)
+        self.token = encode_token(issued - SYNC_OVERLAP)
+        self.budgets = Budget.objects.visible_to(user).order_by().values("pk")
+        if since is not None:
+            self.new_budgets = BudgetUser.objects.filter(
+                visitor=user, updated_at__gt=since
+            ).values("budget")
+
+    def filter(self, queryset, budget_lookup):
+        queryset = queryset.filter(**{f"{budget_lookup}__in": self.budgets})
+        if self.since is None:
+            return queryset
+        return queryset.filter(
+            Q(updated_at__gt=self.since)
+            | Q(**{f"{budget_lookup}__in": self.new_budgets})
+        )
+
+    def deleted(self):
+        """Ids of deleted rows per ``Tombstone.MODELS`` key."""
+        deleted = {model: set() for model, _ in Tombstone.MODELS}
+        if self.since is not None:
+            tombstones = Tombstone.objects.filter(deleted_at__gt=self.since).filter(
+                Q(user=self.user) | Q(user__isnull=True, budget_id__in=self.budgets)
+            )
+            for model, object_id in tombstones.values_list("model", "object_id"):
+                deleted[model].add(object_id)
+        return {model: sorted(ids) for model, ids in deleted.items()}
@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+
+class QueryCountMixin:
+    """Assert that the queries of an endpoint do not grow with its rows."""
+
+    def assertConstantQueries(self, url, add_rows, rows=(1, 100)):
+        """Request ``url`` after ``add_rows(n)`` brought each count in ``rows``.
+
+        ``add_rows`` is called with the number of rows to add, so the
+        second request sees ``rows[1]`` rows. Fails if the two requests
+        run a different number of queries, and lists those of the second.
+        """
+        counts, added = [], 0
+        for total in rows:
+            add_rows(total - added)
+            added = total
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            counts.append(len(queries))
+        if len(set(counts)) > 1:
+            executed = "\n".join(query["sql"] for query in queries.captured_queries)
+            self.fail(f"{url} ran {counts} queries for {list(rows)} rows:\n{executed}")
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Budget, BudgetUser, Category, FinancialEntry
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR", RESPONSE_CACHE_TIMEOUT=0)
+class TestAsyncViews(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user(username="owner", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        self.budget = Budget.objects.create(user=self.owner, name="test")
+        Budget.objects.create(user=self.owner, name="private")
+        for i in range(12):
+            category = Category.objects.create(
+                user=self.owner, name=f"category_{i:02}", budget=self.budget
+            )
+            for day in (1, 1, 2):
+                FinancialEntry.objects.create(
+                    user=self.owner,
+                    category=category,
+                    amount=10 + i,
+                    description="test",
+                    entry_type=FinancialEntry.EXPENSE,
+                    date=f"2021-01-0{day}T00:00:00Z",
+                )
+        BudgetUser.objects.create(
+            owner=self.owner, visitor=self.visitor, budget=self.budget
+        )
+        self.client = APIClient()
+        self.client.login(username="visitor", password="test")
+
+    def assertSameResponse(self, sync_url, async_url, params=None):
+        sync_response = self.client.get(sync_url, params)
+        async_response = self.client.get(async_url, params)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response["Content-Type"], "application/json")
+        return sync_response, async_response
+
+    def test_category_list_matches_sync_view(self):
+        for params in ({}, {"page": 2}):
+            sync_response, async_response = self.assertSameResponse(
+                reverse("categories-list"), reverse("async-categories-list"), params
+            )
+            self.assertEqual(
+                async_response.json(),
+                {
+                    **sync_response.json(),
+                    "next": sync_response.json()["next"]
+                    and sync_response.json()["next"].replace(
+                        "/categories/", "/async/categories/"
+                    ),
+                    "previous": sync_response.json()["previous"]
+                    and sync_response.json()["previous"].replace(
+                        "/categories/", "/async/categories/"
+                    ),
+                },
+            )
+        response = self.client.get(reverse("async-categories-list"), {"page": 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_budget_summary_matches_sync_view(self):
+        for params in ({}, {"period": "day"}, {"period": "week"}):
+            sync_response, async_response = self.assertSameResponse(
+                reverse("budgets-summary", args=[self.budget.pk]),
+                reverse("async-budgets-summary", args=[self.budget.pk]),
+                params,
+            )
+            self.assertEqual(async_response.content, sync_response.content)
+        response = self.client.get(
+            reverse("async-budgets-summary", args=[self.budget.pk + 1])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_walk_entry_pages(self):
+        expected = self.client.get(
+            reverse("financial-entries-list"), {"page_size": 100}
+        ).json()["results"]
+        url, results = reverse("async-financial-entries-list") + "?page_size=5", []
+        while url:
+            page = self.client.get(url).json()
+            results += page["results"]
+            url = page["next"]
+        self.assertEqual(results, expected)
+        self.assertEqual(len(results), 36)
+
+        response = self.client.get(
+            reverse("async-financial-entries-list"), {"cursor": "invalid"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse("async-categories-list"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        token = Token.objects.get(user=self.owner)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = self.client.get(reverse("async-categories-list"))
+        self.assertEqual(response.json()["count"], 12)
+
+        response = self.client.post(reverse("async-categories-list"))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
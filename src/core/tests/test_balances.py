@@ -0,0 +1,194 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import (
+    Budget,
+    Category,
+    CategoryBalance,
+    DirtyMonth,
+    FinancialEntry,
+    MonthlyRollup,
+)
+
+
+class TestBalanceBase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budget = Budget.objects.create(user=self.user, name="test")
+        self.food = Category.objects.create(
+            user=self.user, name="food", budget=self.budget
+        )
+        self.salary = Category.objects.create(
+            user=self.user, name="salary", budget=self.budget
+        )
+
+    def entry(self, category, amount, entry_type=FinancialEntry.EXPENSE):
+        return FinancialEntry(
+            user=self.user,
+            category=category,
+            amount=amount,
+            description="test",
+            entry_type=entry_type,
+            date="2021-01-01T00:00:00Z",
+        )
+
+    def assertBalance(self, category, income, expense):
+        balance = CategoryBalance.objects.get(category=category)
+        self.assertEqual((balance.income, balance.expense), (income, expense))
+
+
+class TestCategoryBalance(TestBalanceBase):
+    def test_balance_created_with_category(self):
+        self.assertBalance(self.food, 0, 0)
+
+    def test_save_and_delete(self):
+        entry = self.entry(self.food, 10)
+        entry.save()
+        self.assertBalance(self.food, 0, 10)
+
+        entry = FinancialEntry.objects.get(pk=entry.pk)
+        entry.amount = Decimal("25.50")
+        entry.category = self.salary
+        entry.entry_type = FinancialEntry.INCOME
+        entry.save()
+        self.assertBalance(self.food, 0, 0)
+        self.assertBalance(self.salary, Decimal("25.50"), 0)
+
+        entry.delete()
+        self.assertBalance(self.salary, 0, 0)
+
+    def test_stale_instances_change_the_stored_row(self):
+        # Two requests load the same entry and write one after the other.
+        entry = self.entry(self.food, 10)
+        entry.save()
+        first = FinancialEntry.objects.get(pk=entry.pk)
+        second = FinancialEntry.objects.get(pk=entry.pk)
+        first.amount = 20
+        first.save()
+        second.amount = 30
+        second.save()
+        self.assertBalance(self.food, 0, 30)
+
+        FinancialEntry.objects.bulk_update([first], ["amount"])
+        self.assertBalance(self.food, 0, 20)
+
+        first.delete()
+        second.delete()
+        self.assertBalance(self.food, 0, 0)
+        self.assertEqual(list(CategoryBalance.inconsistencies()), [])
+
+    def test_bulk_create_update_and_queryset_delete(self):
+        FinancialEntry.objects.bulk_create(
+            [self.entry(self.food, 10), self.entry(self.food, 5)]
+            + [self.entry(self.salary, 100, FinancialEntry.INCOME)]
+        )
+        self.assertBalance(self.food, 0, 15)
+        self.assertBalance(self.salary, 100, 0)
+
+        entries = list(FinancialEntry.objects.filter(category=self.food))
+        for entry in entries:
+            entry.amount = 1
+        FinancialEntry.objects.bulk_update(entries, ["amount"])
+        self.assertBalance(self.food, 0, 2)
+
+        FinancialEntry.objects.filter(category=self.food).delete()
+        self.assertBalance(self.food, 0, 0)
+        self.assertBalance(self.salary, 100, 0)
+
+    def test_bilance_annotations(self):
+        FinancialEntry.objects.bulk_create(
+            [self.entry(self.food, 10), self.entry(self.salary, 100, "Income")]
+        )
+        self.assertEqual(
+            dict(Category.objects.with_bilance().values_list("name", "bilance_total")),
+            {"food": -10, "salary": 100},
+        )
+        self.assertEqual(Budget.objects.with_bilance().get().bilance_total, 90)
+
+
+class TestRebuildBalancesCommand(TestBalanceBase):
+    def test_check_and_rebuild(self):
+        self.entry(self.food, 10).save()
+        CategoryBalance.objects.filter(category=self.food).update(expense=3)
+        CategoryBalance.objects.filter(category=self.salary).delete()
+
+        with self.assertRaisesMessage(CommandError, "1 balances are inconsistent."):
+            call_command("rebuild_balances", check=True, stdout=io.StringIO())
+
+        stdout = io.StringIO()
+        call_command("rebuild_balances", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "Rebuilt 2 balances.\n")
+        self.assertBalance(self.food, 0, 10)
+        self.assertBalance(self.salary, 0, 0)
+
+        stdout = io.StringIO()
+        call_command("rebuild_balances", check=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "All balances are consistent.\n")
+
+
+class TestMonthlyRollup(TestBalanceBase):
+    def rollups(self):
+        return set(
+            MonthlyRollup.objects.values_list(
+                "category__name", "month", "entry_type", "total", "count"
+            )
+        )
+
+    def test_writes_mark_months_dirty(self):
+        entry = self.entry(self.food, 10)
+        entry.save()
+        self.assertEqual(
+            set(DirtyMonth.objects.values_list("category", "month")),
+            {(self.food.pk, date(2021, 1, 1))},
+        )
+        MonthlyRollup.refresh()
+        self.assertFalse(DirtyMonth.objects.exists())
+
+        entry.date = "2021-03-10T00:00:00Z"
+        entry.save()
+        FinancialEntry.objects.bulk_create([self.entry(self.salary, 5)])
+        self.assertEqual(
+            set(DirtyMonth.objects.values_list("category", "month")),
+            {
+                (self.food.pk, date(2021, 1, 1)),
+                (self.food.pk, date(2021, 3, 1)),
+                (self.salary.pk, date(2021, 1, 1)),
+            },
+        )
+
+    def test_refresh_rollups_command(self):
+        FinancialEntry.objects.bulk_create(
+            [self.entry(self.food, 10), self.entry(self.food, 5)]
+            + [self.entry(self.salary, 100, FinancialEntry.INCOME)]
+        )
+        stdout = io.StringIO()
+        call_command("refresh_rollups", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "Refreshed 2 months.\n")
+        january = date(2021, 1, 1)
+        self.assertEqual(
+            self.rollups(),
+            {
+                ("food", january, FinancialEntry.EXPENSE, 15, 2),
+                ("salary", january, FinancialEntry.INCOME, 100, 1),
+            },
+        )
+
+        FinancialEntry.objects.filter(category=self.food).delete()
+        call_command("refresh_rollups", stdout=io.StringIO())
+        self.assertEqual(
+            self.rollups(), {("salary", january, FinancialEntry.INCOME, 100, 1)}
+        )
+
+        MonthlyRollup.objects.update(total=1)
+        stdout = io.StringIO()
+        call_command("refresh_rollups", all=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "Refreshed 1 months.\n")
+        self.assertEqual(
+            self.rollups(), {("salary", january, FinancialEntry.INCOME, 100, 1)}
+        )
@@ -1,7 +1,10 @@
+import io
+from decimal import Decimal
 from urllib.parse import urlencode
 
 from datetime import datetime
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from django.urls import reverse
@@ -9,7 +12,15 @@ from rest_framework import status
 
 from core.factories.budget_factory import BudgetFactory
 from core.factories.user_factory import UserFactory, DEFAULT_PASSWORD
-from core.models import Budget, BudgetUser, User
+from core.models import (
+    Budget,
+    BudgetUser,
+    Category,
+    DirtyMonth,
+    FinancialEntry,
+    MonthlyRollup,
+    User,
+)
 
 
 class TestBudgetBase(TestCase):
@@ -173,3 +184,190 @@ class TestSimpleHTTPMethodsBudget(TestBudgetBase):
         self.client.login(**self.login)
         response = self.client.delete(reverse("budgets-detail", args=[1]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestBudgetVisibility(TestBudgetBase):
+    def setUp(self):
+        super().setUp()
+        self.budget = BudgetFactory(user=self.user, name="test")
+        for _ in range(3):
+            BudgetUser.objects.create(
+                owner=self.user,
+                visitor=UserFactory(),
+                budget=self.budget,
+            )
+            owner = UserFactory()
+            BudgetUser.objects.create(
+                owner=owner,
+                visitor=self.user,
+                budget=BudgetFactory(user=owner),
+            )
+
+    def test_budget_listed_once_regardless_of_shares(self):
+        self.client.login(**self.login)
+        response = self.client.get(reverse("budgets-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 4)
+        urls = [budget["url"] for budget in response.json()["results"]]
+        self.assertEqual(len(urls), len(set(urls)))
+
+    def test_visible_to(self):
+        self.assertEqual(Budget.objects.visible_to(self.user).count(), 4)
+        self.assertEqual(Budget.objects.shared_with(self.user).count(), 3)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestBudgetSummary(TestBudgetBase):
+    def setUp(self):
+        super().setUp()
+        self.budget = BudgetFactory(user=self.user, name="test")
+        food = Category.objects.create(user=self.user, name="food", budget=self.budget)
+        salary = Category.objects.create(
+            user=self.user, name="salary", budget=self.budget
+        )
+        for category, amount, entry_type, date in (
+            (food, 10, FinancialEntry.EXPENSE, "2021-01-05T10:00:00Z"),
+            (food, 15, FinancialEntry.EXPENSE, "2021-01-20T10:00:00Z"),
+            (food, 5, FinancialEntry.EXPENSE, "2021-02-01T10:00:00Z"),
+            (salary, 1000, FinancialEntry.INCOME, "2021-01-31T10:00:00Z"),
+        ):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=category,
+                amount=amount,
+                description="test",
+                entry_type=entry_type,
+                date=date,
+            )
+        self.food, self.salary = food, salary
+        self.url = reverse("budgets-summary", args=[self.budget.pk])
+
+    def test_summary_by_month(self):
+        self.client.login(**self.login)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "category": self.food.pk,
+                    "category_name": "food",
+                    "entry_type": FinancialEntry.EXPENSE,
+                    "period": "2021-01-01",
+                    "total": "25.00",
+                    "count": 2,
+                },
+                {
+                    "category": self.salary.pk,
+                    "category_name": "salary",
+                    "entry_type": FinancialEntry.INCOME,
+                    "period": "2021-01-01",
+                    "total": "1000.00",
+                    "count": 1,
+                },
+                {
+                    "category": self.food.pk,
+                    "category_name": "food",
+                    "entry_type": FinancialEntry.EXPENSE,
+                    "period": "2021-02-01",
+                    "total": "5.00",
+                    "count": 1,
+                },
+            ],
+        )
+
+    def test_summary_by_year_in_date_range(self):
+        self.client.login(**self.login)
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                self.url,
+                {"period": "year", "date_from": "2021-01-10", "date_to": "2021-01-31"},
+            )
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in response.json()],
+            [("food", "15.00"), ("salary", "1000.00")],
+        )
+
+    def test_summary_of_large_totals(self):
+        FinancialEntry.objects.bulk_create(
+            FinancialEntry(
+                user=self.user,
+                category=self.salary,
+                amount=Decimal("99999999.99"),
+                description="test",
+                entry_type=FinancialEntry.INCOME,
+                date="2022-06-01T10:00:00Z",
+            )
+            for _ in range(200)
+        )
+        self.client.login(**self.login)
+        response = self.client.get(self.url, {"period": "year"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[-1]["total"], "19999999998.00")
+
+    def test_summary_combines_rollups_with_live_entries(self):
+        call_command("refresh_rollups", stdout=io.StringIO())
+        self.assertFalse(DirtyMonth.objects.exists())
+        # Tamper with a rollup to tell which months are read from rollups.
+        MonthlyRollup.objects.filter(category=self.salary).update(total=999)
+        FinancialEntry.objects.create(
+            user=self.user,
+            category=self.food,
+            amount=1,
+            description="test",
+            entry_type=FinancialEntry.EXPENSE,
+            date="2021-02-15T10:00:00Z",
+        )
+        self.client.login(**self.login)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {"period": "year"})
+        self.assertEqual(
+            [
+                (row["category_name"], row["total"], row["count"])
+                for row in response.json()
+            ],
+            [("food", "31.00", 4), ("salary", "999.00", 1)],
+        )
+
+        # Months cut by the date range are always summed from the entries.
+        response = self.client.get(self.url, {"date_from": "2021-01-06"})
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in response.json()],
+            [("food", "15.00"), ("salary", "1000.00"), ("food", "6.00")],
+        )
+
+    def test_summary_after_moving_a_category(self):
+        call_command("refresh_rollups", stdout=io.StringIO())
+        # Tamper with a rollup to tell that it is still read after the move.
+        MonthlyRollup.objects.filter(category=self.salary).update(total=999)
+        other = BudgetFactory(user=self.user, name="other")
+        self.client.login(**self.login)
+        response = self.client.patch(
+            reverse("categories-detail", args=[self.salary.pk]),
+            {"budget": reverse("budgets-detail", args=[other.pk])},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url, {"period": "year"})
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in response.json()],
+            [("food", "30.00")],
+        )
+        response = self.client.get(
+            reverse("budgets-summary", args=[other.pk]), {"period": "year"}
+        )
+        self.assertEqual(
+            [(row["category_name"], row["total"]) for row in response.json()],
+            [("salary", "999.00")],
+        )
+
+    def test_summary_invalid_period(self):
+        self.client.login(**self.login)
+        response = self.client.get(self.url, {"period": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_of_foreign_budget(self):
+        self.client.force_authenticate(UserFactory())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,12 +1,14 @@
 from urllib.parse import urlencode
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from django.urls import reverse
 from rest_framework import status
 
-from core.models import Budget, Category
+from core.models import Budget, BudgetUser, Category, FinancialEntry
 
 
 @override_settings(MEDIA_ROOT="TEST_DIR")
@@ -159,3 +161,303 @@ class TestSimpleHTTPMethodsCategoriesView(TestCase):
         self.client.login(username="test", password="test")
         response = self.client.delete(reverse("categories-detail", args=[1]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestCategoriesBilance(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username="test", password="test", email="test@tivix.com"
+        )
+        budget = Budget.objects.create(user=self.user, name="test")
+        for name in ("first", "second", "third"):
+            category = Category.objects.create(user=self.user, name=name, budget=budget)
+            for amount, entry_type in (
+                (100, FinancialEntry.INCOME),
+                (30, FinancialEntry.EXPENSE),
+                (20, FinancialEntry.EXPENSE),
+            ):
+                FinancialEntry.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=amount,
+                    description="test",
+                    entry_type=entry_type,
+                    date="2021-01-01T00:00:00Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_bilance_is_annotated(self):
+        category = Category.objects.with_bilance().get(name="first")
+        self.assertEqual(category.bilance_total, 50)
+
+    def test_list_categories_bilance_does_not_load_entries(self):
+        # session, user, count, categories, prefetched entries
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("categories-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [category["bilance"] for category in response.json()["results"]],
+            [50, 50, 50],
+        )
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestCategoriesVisibility(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="test")
+        Category.objects.create(user=self.user, name="test", budget=budget)
+        for i in range(3):
+            BudgetUser.objects.create(
+                owner=self.user,
+                visitor=User.objects.create_user(username=f"visitor_{i}"),
+                budget=budget,
+            )
+        self.client = APIClient()
+
+    def test_list_categories_shared_budget_not_duplicated(self):
+        self.client.login(username="test", password="test")
+        response = self.client.get(reverse("categories-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_list_categories_visitor(self):
+        visitor = User.objects.get(username="visitor_0")
+        self.client.force_authenticate(visitor)
+        response = self.client.get(reverse("categories-list"))
+        self.assertEqual(response.json()["count"], 1)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestCompactCategories(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budget = Budget.objects.create(user=self.user, name="test")
+        self.category = Category.objects.create(
+            user=self.user, name="food", budget=self.budget
+        )
+        for day in range(1, 4):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=10,
+                description=f"day {day}",
+                entry_type=FinancialEntry.EXPENSE,
+                date=f"2021-01-0{day}T00:00:00Z",
+            )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_list_compact(self):
+        # session, user, count, categories with bilance
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("categories-list"), {"compact": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "id": self.category.pk,
+                    "name": "food",
+                    "budget": f"http://testserver/budgets/{self.budget.pk}/",
+                    "bilance": -30,
+                }
+            ],
+        )
+
+    def test_get_compact(self):
+        response = self.client.get(
+            reverse("categories-detail", args=[self.category.pk]), {"compact": "1"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()), {"id", "name", "budget", "bilance"})
+
+    def test_not_compact(self):
+        response = self.client.get(reverse("categories-list"), {"compact": "false"})
+        self.assertEqual(len(response.json()["results"][0]["financial_entries"]), 3)
+
+    def test_invalid_compact(self):
+        response = self.client.get(reverse("categories-list"), {"compact": "maybe"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"compact": ["Must be a valid boolean."]})
+
+    def test_entries(self):
+        url = reverse("categories-entries", args=[self.category.pk])
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = response.json()
+        self.assertEqual(
+            [entry["description"] for entry in page["results"]], ["day 3", "day 2"]
+        )
+        self.assertEqual(
+            page["results"][0]["category"],
+            f"http://testserver/categories/{self.category.pk}/",
+        )
+        response = self.client.get(page["next"])
+        self.assertEqual(
+            [entry["description"] for entry in response.json()["results"]], ["day 1"]
+        )
+        self.assertIsNone(response.json()["next"])
+
+    def test_entries_of_other_category(self):
+        other = User.objects.create_user(username="other", password="test")
+        self.client.force_authenticate(other)
+        url = reverse("categories-entries", args=[self.category.pk])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestCategoriesFilter(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budgets = [
+            Budget.objects.create(user=self.user, name=f"budget {i}") for i in range(2)
+        ]
+        self.categories = []
+        for i in range(3):
+            category = Category.objects.create(
+                user=self.user, name=f"category {i}", budget=self.budgets[i % 2]
+            )
+            self.categories.append(category)
+            for day in range(1, i + 2):
+                FinancialEntry.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=day * 10,
+                    description=f"day {day}",
+                    entry_type=FinancialEntry.INCOME,
+                    date=f"2021-01-{day:02d}T12:00:00Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def names(self, **params):
+        response = self.client.get(reverse("categories-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        return sorted(category["name"] for category in response.json()["results"])
+
+    def test_budget(self):
+        self.assertEqual(
+            self.names(budget=self.budgets[0].pk), ["category 0", "category 2"]
+        )
+
+    def test_categories_with_matching_entries(self):
+        self.assertEqual(
+            self.names(date__gte="2021-01-02"), ["category 1", "category 2"]
+        )
+        self.assertEqual(self.names(amount__gte=30), ["category 2"])
+        self.assertEqual(
+            self.names(entry_type=FinancialEntry.EXPENSE, budget=self.budgets[0].pk), []
+        )
+
+    def test_entry_filters_match_the_same_entry(self):
+        category = Category.objects.create(
+            user=self.user, name="category 3", budget=self.budgets[0]
+        )
+        for date in ("2022-12-15T12:00:00Z", "2023-03-15T12:00:00Z"):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=category,
+                amount=10,
+                description=date,
+                entry_type=FinancialEntry.INCOME,
+                date=date,
+            )
+        self.assertEqual(self.names(date__gte="2023-01-01", date__lte="2023-01-31"), [])
+        self.assertEqual(
+            self.names(date__gte="2022-12-01", date__lte="2022-12-31"), ["category 3"]
+        )
+        self.assertEqual(self.names(date__lte="2021-01-01", amount__gte=20), [])
+        self.assertEqual(
+            self.names(date__gte="2021-01-02", date__lte="2021-01-02"),
+            ["category 1", "category 2"],
+        )
+
+    def test_matching_entries_do_not_duplicate_categories(self):
+        response = self.client.get(reverse("categories-list"), {"amount__gte": 10})
+        self.assertEqual(response.json()["count"], 3)
+
+    def test_search_is_by_name_only(self):
+        self.assertEqual(self.names(search="category 1"), ["category 1"])
+        self.assertEqual(self.names(search="2021"), [])
+
+    def test_entries_action_filters(self):
+        url = reverse("categories-entries", args=[self.categories[2].pk])
+        response = self.client.get(url, {"amount__lte": 20})
+        self.assertEqual(
+            [entry["description"] for entry in response.json()["results"]],
+            ["day 2", "day 1"],
+        )
+        response = self.client.get(url, {"date__lte": "someday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.json()), ["date__lte"])
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR", RESPONSE_CACHE_TIMEOUT=0)
+class TestCategoriesOrdering(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="test")
+        # name: [(amount, entry type, day)]
+        entries = {
+            "a": [(100, FinancialEntry.INCOME, 1), (30, FinancialEntry.EXPENSE, 9)],
+            "b": [(10, FinancialEntry.EXPENSE, 5)],
+            "c": [(20, FinancialEntry.INCOME, 2), (20, FinancialEntry.INCOME, 3)],
+            "d": [],
+        }
+        for name, rows in entries.items():
+            category = Category.objects.create(user=self.user, name=name, budget=budget)
+            for amount, entry_type, day in rows:
+                FinancialEntry.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=amount,
+                    description="test",
+                    entry_type=entry_type,
+                    date=f"2021-01-{day:02d}T00:00:00Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def names(self, ordering):
+        response = self.client.get(
+            reverse("categories-list"), {"ordering": ordering, "compact": "true"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [category["name"] for category in response.json()["results"]]
+
+    def test_latest_date(self):
+        self.assertEqual(self.names("-latest_date"), ["a", "b", "c", "d"])
+        # Categories without entries come last either way.
+        self.assertEqual(self.names("latest_date"), ["c", "b", "a", "d"])
+
+    def test_total_amount(self):
+        self.assertEqual(self.names("-total_amount"), ["a", "c", "b", "d"])
+
+    def test_bilance(self):
+        self.assertEqual(self.names("bilance"), ["b", "d", "c", "a"])
+        self.assertEqual(self.names("-bilance,name"), ["a", "c", "d", "b"])
+
+    def test_one_row_per_category(self):
+        response = self.client.get(
+            reverse("categories-list"), {"ordering": "-latest_date"}
+        )
+        self.assertEqual(response.json()["count"], 4)
+        self.assertEqual(len(response.json()["results"]), 4)
+
+    def test_entry_fields_are_not_orderable(self):
+        self.assertEqual(self.names("-financial_entries__amount"), ["a", "b", "c", "d"])
+
+    def test_no_entries_without_ordering(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names(""), ["a", "b", "c", "d"])
+        self.assertFalse(
+            [query for query in queries if "core_financialentry" in query["sql"]]
+        )
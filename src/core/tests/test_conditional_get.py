@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Budget, BudgetUser, Category, FinancialEntry
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.owner = User.objects.create_user(username="owner", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        self.budget = Budget.objects.create(user=self.owner, name="test")
+        self.category = Category.objects.create(
+            user=self.owner, name="food", budget=self.budget
+        )
+        self.entry = FinancialEntry.objects.create(
+            user=self.owner,
+            category=self.category,
+            amount=10,
+            description="test",
+            entry_type=FinancialEntry.EXPENSE,
+            date="2021-01-01T00:00:00Z",
+        )
+        BudgetUser.objects.create(
+            owner=self.owner, visitor=self.visitor, budget=self.budget
+        )
+        self.client = APIClient()
+
+    def get(self, user, url, **headers):
+        self.client.force_authenticate(user)
+        return self.client.get(url, **headers)
+
+    def test_matching_etag_skips_the_view(self):
+        url = reverse("budgets-list")
+        response = self.get(self.owner, url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response.headers["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get(self.owner, url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # Validators differ per URL and per user.
+        response = self.get(
+            self.owner, reverse("categories-list"), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.get(self.visitor, url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_owner_changes_invalidate_visitor_validators(self):
+        url = reverse("financial-entries-detail", args=[self.entry.pk])
+        response = self.get(self.visitor, url)
+        etag = response.headers["ETag"]
+        self.entry.amount = 20
+        self.entry.save()
+        response = self.get(self.visitor, url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["amount"], "20.00")
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_if_modified_since(self):
+        url = reverse("categories-list")
+        last_modified = self.get(self.owner, url).headers["Last-Modified"]
+        response = self.get(self.owner, url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Category.objects.create(user=self.owner, name="rent", budget=self.budget)
+        response = self.get(
+            self.owner, url, HTTP_IF_MODIFIED_SINCE="Thu, 01 Jan 2015 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 2)
+
+    def test_no_validators_on_writes(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            reverse("budgets-list"), {"name": "other", "user": self.owner.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("ETag", response.headers)
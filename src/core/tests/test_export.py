@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import exporters
+from core.models import Budget, Category, FinancialEntry
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestExport(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budget = Budget.objects.create(user=self.user, name="test")
+        other_budget = Budget.objects.create(user=self.user, name="other")
+        for budget in (self.budget, other_budget):
+            category = Category.objects.create(
+                user=self.user, name=budget.name, budget=budget
+            )
+            for day in range(1, 6):
+                FinancialEntry.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=day,
+                    description=f"entry, {day}",
+                    entry_type=FinancialEntry.EXPENSE,
+                    date=f"2021-01-{day:02d}T00:00:00Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def export(self, name, export_format, **kwargs):
+        response = self.client.get(
+            reverse(name, kwargs={"export_format": export_format, **kwargs})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_export_entries_csv(self):
+        with mock.patch.object(exporters, "chunked", wraps=exporters.chunked) as chunks:
+            response, content = self.export("financial-entries-export", "csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="financial-entries.csv"',
+        )
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 10)
+        latest = FinancialEntry.objects.order_by("-date", "-id")[0]
+        self.assertEqual(
+            rows[0],
+            {
+                "id": str(latest.pk),
+                "date": "2021-01-05T00:00:00Z",
+                "budget": str(latest.category.budget_id),
+                "category": str(latest.category_id),
+                "category_name": latest.category.name,
+                "entry_type": "Expense",
+                "amount": "5.00",
+                "description": "entry, 5",
+                "user": str(self.user.pk),
+            },
+        )
+        chunks.assert_called_once()
+
+    def test_export_budget_ndjson(self):
+        response, content = self.export("budgets-export", "ndjson", pk=self.budget.pk)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [row["amount"] for row in rows], ["5.00", "4.00", "3.00", "2.00", "1.00"]
+        )
+        self.assertEqual({row["budget"] for row in rows}, {self.budget.pk})
+
+    @skipIf(exporters.pyarrow is None, "pyarrow is not installed")
+    def test_export_budget_parquet(self):
+        chunked = exporters.chunked
+        with mock.patch.object(
+            exporters, "chunked", lambda rows, size: chunked(rows, 2)
+        ):
+            _, content = self.export("budgets-export", "parquet", pk=self.budget.pk)
+        table = exporters.pyarrow.parquet.read_table(
+            exporters.pyarrow.BufferReader(content)
+        )
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(
+            [str(amount) for amount in table.column("amount").to_pylist()],
+            ["5.00", "4.00", "3.00", "2.00", "1.00"],
+        )
+
+    def test_export_parquet_without_pyarrow(self):
+        with mock.patch.object(exporters, "pyarrow", None):
+            response = self.client.get(
+                reverse("financial-entries-export", kwargs={"export_format": "parquet"})
+            )
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    def test_export_foreign_budget(self):
+        self.client.force_authenticate(User.objects.create_user(username="other"))
+        response = self.client.get(
+            reverse(
+                "budgets-export", kwargs={"export_format": "csv", "pk": self.budget.pk}
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
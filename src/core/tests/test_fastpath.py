@@ -0,0 +1,128 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.fastpath import Unsupported, ValuesSerializer
+from core.models import Budget, BudgetUser, Category, FinancialEntry
+from core.serializers import (
+    BudgetSerializer,
+    CategoryCompactSerializer,
+    CategorySerializer,
+    FinancialEntrySerializer,
+)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR", RESPONSE_CACHE_TIMEOUT=0)
+class TestFastListSerializers(TestCase):
+    """The values() rendering produces the same bytes as the serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        owner = User.objects.create_user(username="owner", password="test")
+        shared = Budget.objects.create(user=owner, name="shared")
+        BudgetUser.objects.create(owner=owner, visitor=self.user, budget=shared)
+        budgets = [Budget.objects.create(user=self.user, name="own"), shared]
+        for i in range(15):
+            budget = budgets[i % 2]
+            category = Category.objects.create(
+                user=budget.user, name=f"category {i}", budget=budget
+            )
+            for day in range(1, i % 4 + 1):
+                FinancialEntry.objects.create(
+                    user=budget.user,
+                    category=category,
+                    amount=Decimal("10.5") * day,
+                    description=f'entry {i} ünïcode "quoted"',
+                    entry_type=(FinancialEntry.INCOME, FinancialEntry.EXPENSE)[day % 2],
+                    date=f"2021-0{day}-0{i % 9 + 1}T1{day}:30:00.123456Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def assertSameContent(self, url):
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            fast = self.client.get(url)
+        with override_settings(FAST_LIST_SERIALIZERS=False):
+            slow = self.client.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast.json()
+
+    def test_financial_entries(self):
+        page = self.assertSameContent(reverse("financial-entries-list"))
+        self.assertEqual(len(page["results"]), 10)
+        page = self.assertSameContent(page["next"])
+        self.assertEqual(len(page["results"]), 10)
+        self.assertSameContent(reverse("financial-entries-list") + "?page_size=100")
+
+    def test_categories(self):
+        page = self.assertSameContent(reverse("categories-list"))
+        self.assertEqual(page["count"], 15)
+        self.assertSameContent(page["next"])
+        self.assertSameContent(reverse("categories-list") + "?compact=true")
+        self.assertSameContent(reverse("categories-list") + "?search=category 1")
+        self.assertSameContent(reverse("categories-list") + "?ordering=name")
+        self.assertSameContent(reverse("categories-list") + "?ordering=-latest_date")
+
+    def test_format_suffix(self):
+        self.assertSameContent("/financial-entries.json")
+        self.assertSameContent("/categories.json")
+
+    def test_browsable_api(self):
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            response = self.client.get(
+                reverse("categories-list"), HTTP_ACCEPT="text/html"
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class TestValuesSerializer(TestCase):
+    def setUp(self):
+        super().setUp()
+        request = Request(APIRequestFactory().get("/", HTTP_HOST="localhost"))
+        self.context = {"request": request}
+
+    def test_unsupported_fields(self):
+        class MethodSerializer(FinancialEntrySerializer):
+            extra = serializers.SerializerMethodField()
+
+        with self.assertRaises(Unsupported):
+            ValuesSerializer(MethodSerializer(context=self.context))
+        with self.assertRaises(Unsupported):
+            # Many to many through the shared budget users.
+            ValuesSerializer(BudgetSerializer(context=self.context))
+
+    def test_format_suffix_is_unsupported(self):
+        with self.assertRaises(Unsupported):
+            ValuesSerializer(
+                FinancialEntrySerializer(context={**self.context, "format": "json"})
+            )
+
+    def test_columns(self):
+        fast = ValuesSerializer(FinancialEntrySerializer(context=self.context))
+        self.assertEqual(
+            fast.columns,
+            [
+                "id",
+                "pk",
+                "category_id",
+                "amount",
+                "description",
+                "date",
+                "entry_type",
+                "updated_at",
+                "user_id",
+            ],
+        )
+
+    def test_categories_are_supported(self):
+        fast = ValuesSerializer(CategorySerializer(context=self.context))
+        self.assertEqual(fast.columns, ["budget_id", "name", "pk", "bilance_total"])
+        fast = ValuesSerializer(CategoryCompactSerializer(context=self.context))
+        self.assertEqual(fast.columns, ["id", "name", "budget_id", "bilance_total"])
@@ -1,11 +1,16 @@
+from unittest import mock, skipUnless
 from urllib.parse import urlencode
 
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import NotFound
 from rest_framework.test import APIClient
 
-from core.models import Budget, Category, FinancialEntry
+from core.models import Budget, Category, CategoryBalance, FinancialEntry
+from core.pagination import FinancialEntryCursorPagination
 
 
 @override_settings(MEDIA_ROOT="TEST_DIR")
@@ -53,7 +58,6 @@ class TestSimpleHTTPMethodsFinancialEntriesView(TestCase):
         self.assertEqual(
             response.json(),
             {
-                "count": 1,
                 "next": None,
                 "previous": None,
                 "results": [
@@ -65,6 +69,7 @@ class TestSimpleHTTPMethodsFinancialEntriesView(TestCase):
                         "description": "test",
                         "date": response.json()["results"][0]["date"],
                         "entry_type": "EXPENSE",
+                        "updated_at": response.json()["results"][0]["updated_at"],
                         "user": 1,
                     },
                 ],
@@ -93,6 +98,404 @@ class TestSimpleHTTPMethodsFinancialEntriesView(TestCase):
                 "description": "test",
                 "date": response.json()["date"],
                 "entry_type": "EXPENSE",
+                "updated_at": response.json()["updated_at"],
                 "user": 1,
             },
         )
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestFinancialEntriesPagination(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="test")
+        category = Category.objects.create(user=self.user, name="test", budget=budget)
+        for day in range(1, 13):
+            # Two entries per day share the same date to exercise the id tie-break.
+            for _ in range(2):
+                FinancialEntry.objects.create(
+                    user=self.user,
+                    category=category,
+                    amount=10,
+                    description="test",
+                    entry_type=FinancialEntry.INCOME,
+                    date=f"2021-01-{day:02d}T00:00:00Z",
+                )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_walk_cursor_pages(self):
+        urls = []
+        next_page = reverse("financial-entries-list") + "?page_size=5"
+        while next_page:
+            response = self.client.get(next_page)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.json())
+            urls.extend(entry["url"] for entry in response.json()["results"])
+            next_page = response.json()["next"]
+        expected = [
+            f"http://testserver/financial-entries/{entry.pk}/"
+            for entry in FinancialEntry.objects.order_by("-date", "-id")
+        ]
+        self.assertEqual(urls, expected)
+
+    def test_walk_cursor_pages_backwards(self):
+        next_page = reverse("financial-entries-list") + "?page_size=5"
+        pages = []
+        while next_page:
+            response = self.client.get(next_page).json()
+            pages.append([entry["url"] for entry in response["results"]])
+            next_page = response["next"]
+        previous_page, walked_back = response["previous"], []
+        while previous_page:
+            response = self.client.get(previous_page).json()
+            walked_back.append([entry["url"] for entry in response["results"]])
+            previous_page = response["previous"]
+        self.assertEqual(walked_back, pages[-2::-1])
+
+    def test_equal_dates_are_not_skipped_by_offset(self):
+        FinancialEntry.objects.update(date="2021-01-01T00:00:00Z")
+        url = reverse("financial-entries-list") + "?page_size=5"
+        for _ in range(3):
+            url = self.client.get(url).json()["next"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertFalse(
+            [query for query in queries if "OFFSET" in query["sql"].upper()]
+        )
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(FinancialEntryCursorPagination, "max_page_size", 5):
+            response = self.client.get(
+                reverse("financial-entries-list"), {"page_size": 1000}
+            )
+        self.assertEqual(len(response.json()["results"]), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse("financial-entries-list"), {"cursor": "invalid"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_cursor_position(self):
+        pagination = FinancialEntryCursorPagination()
+        for position in ("2021-01-01", "not a date|1", "2021-01-01T00:00:00|x"):
+            with self.assertRaises(NotFound):
+                pagination.parse_position(position)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestFinancialEntriesFilter(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budgets = [
+            Budget.objects.create(user=self.user, name=f"budget {i}") for i in range(2)
+        ]
+        self.categories = [
+            Category.objects.create(user=self.user, name=f"category {i}", budget=budget)
+            for i, budget in enumerate(self.budgets)
+        ]
+        for day in range(1, 7):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=self.categories[day % 2],
+                amount=day * 10,
+                description=f"day {day}",
+                entry_type=(FinancialEntry.INCOME, FinancialEntry.EXPENSE)[
+                    day % 3 == 0
+                ],
+                date=f"2021-01-{day:02d}T12:00:00Z",
+            )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def descriptions(self, url=None, **params):
+        response = self.client.get(url or reverse("financial-entries-list"), params)
+        self.assertEqual(response.status_code, 200, response.json())
+        return [entry["description"] for entry in response.json()["results"]]
+
+    def test_date_range(self):
+        self.assertEqual(
+            self.descriptions(date__gte="2021-01-02T12:00:00Z", date__lte="2021-01-04"),
+            ["day 4", "day 3", "day 2"],
+        )
+
+    def test_bare_end_date_covers_the_whole_day(self):
+        self.assertEqual(self.descriptions(date__lte="2021-01-01"), ["day 1"])
+        self.assertEqual(self.descriptions(date__lte="2021-01-01T11:59:59Z"), [])
+        self.assertEqual(self.descriptions(date__gte="2021-01-06"), ["day 6"])
+        response = self.client.get(
+            reverse("financial-entries-list"), {"date__lte": "2021-02-30"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ["date__lte"])
+
+    def test_amount_range(self):
+        self.assertEqual(
+            self.descriptions(amount__gte="20", amount__lte="40.00"),
+            ["day 4", "day 3", "day 2"],
+        )
+
+    def test_entry_type(self):
+        self.assertEqual(
+            self.descriptions(entry_type=FinancialEntry.EXPENSE), ["day 6", "day 3"]
+        )
+
+    def test_category_and_budget(self):
+        expected = ["day 5", "day 3", "day 1"]
+        self.assertEqual(self.descriptions(category=self.categories[1].pk), expected)
+        self.assertEqual(self.descriptions(budget=self.budgets[1].pk), expected)
+        self.assertEqual(
+            self.descriptions(budget=self.budgets[1].pk, amount__lte=30),
+            ["day 3", "day 1"],
+        )
+
+    def test_other_users_budget(self):
+        other = User.objects.create_user(username="other", password="test")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.descriptions(budget=self.budgets[0].pk), [])
+
+    def test_filters_are_not_text_search(self):
+        # "1" would match every date and amount as text.
+        self.assertEqual(self.descriptions(amount__gte="1", amount__lte="1"), [])
+
+    def test_invalid_values(self):
+        response = self.client.get(
+            reverse("financial-entries-list"),
+            {"date__gte": "yesterday", "amount__lte": "a lot", "entry_type": "Gift"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(response.json()), {"date__gte", "amount__lte", "entry_type"}
+        )
+
+    def test_paginates_filtered_entries(self):
+        response = self.client.get(
+            reverse("financial-entries-list"),
+            {"entry_type": FinancialEntry.INCOME, "page_size": 2},
+        )
+        self.assertEqual(
+            [entry["description"] for entry in response.json()["results"]],
+            ["day 5", "day 4"],
+        )
+        self.assertEqual(self.descriptions(response.json()["next"]), ["day 2", "day 1"])
+
+    def test_export_is_filtered(self):
+        url = reverse("financial-entries-export", args=["ndjson"])
+        response = self.client.get(url, {"amount__gte": 60})
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(content.count("\n"), 1)
+        self.assertIn("day 6", content)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestFinancialEntriesSearch(TestCase):
+    DESCRIPTIONS = [
+        "LIDL Warszawa card payment",
+        "Salary ACME",
+        "Biedronka 1234",
+        "lidl sklep",
+        "Biedronka Biedronka refund",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="test")
+        self.category = Category.objects.create(
+            user=self.user, name="test", budget=budget
+        )
+        for day, description in enumerate(self.DESCRIPTIONS, start=1):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=day * 10,
+                description=description,
+                entry_type=FinancialEntry.EXPENSE,
+                date=f"2021-01-{day:02d}T12:00:00Z",
+            )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def descriptions(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.json())
+        return [entry["description"] for entry in response.json()["results"]]
+
+    def test_list_q(self):
+        self.assertEqual(
+            self.descriptions("financial-entries-list", q="lidl"),
+            ["lidl sklep", "LIDL Warszawa card payment"],
+        )
+        self.assertEqual(
+            self.descriptions("financial-entries-list", q="Lidl warszawa"),
+            ["LIDL Warszawa card payment"],
+        )
+        self.assertEqual(self.descriptions("financial-entries-list", q="rent"), [])
+
+    def test_list_q_with_filters(self):
+        self.assertEqual(
+            self.descriptions("financial-entries-list", q="biedronka", amount__lte=30),
+            ["Biedronka 1234"],
+        )
+
+    def test_category_entries_q(self):
+        url = reverse("categories-entries", args=[self.category.pk])
+        response = self.client.get(url, {"q": "salary"})
+        self.assertEqual(
+            [entry["description"] for entry in response.json()["results"]],
+            ["Salary ACME"],
+        )
+
+    def test_search(self):
+        response = self.client.get(
+            reverse("financial-entries-search"), {"q": "lidl", "page_size": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNotNone(response.json()["next"])
+
+    def test_search_requires_q(self):
+        response = self.client.get(reverse("financial-entries-search"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"q": ["This field is required."]})
+
+    @skipUnless(connection.vendor == "postgresql", "Ranked search needs PostgreSQL.")
+    def test_search_is_ranked(self):
+        self.assertEqual(
+            self.descriptions("financial-entries-search", q="biedronka"),
+            ["Biedronka Biedronka refund", "Biedronka 1234"],
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "Trigram search needs PostgreSQL.")
+    def test_misspelled_names(self):
+        self.assertEqual(
+            self.descriptions("financial-entries-list", q="biedrnka"),
+            ["Biedronka Biedronka refund", "Biedronka 1234"],
+        )
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestFinancialEntriesBulk(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.other = User.objects.create_user(username="other", password="test")
+        budget = Budget.objects.create(user=self.user, name="test")
+        self.categories = [
+            Category.objects.create(user=self.user, name=f"test_{i}", budget=budget)
+            for i in range(3)
+        ]
+        other_budget = Budget.objects.create(user=self.other, name="other")
+        self.other_category = Category.objects.create(
+            user=self.other, name="other", budget=other_budget
+        )
+        self.url = reverse("financial-entries-bulk")
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def entry_data(self, category, amount=10):
+        return {
+            "category": reverse("categories-detail", args=[category.pk]),
+            "amount": f"{amount}.00",
+            "description": "test",
+            "entry_type": FinancialEntry.EXPENSE,
+            "date": "2021-01-01T00:00:00Z",
+        }
+
+    def test_bulk_create(self):
+        data = [self.entry_data(category) for category in self.categories * 10]
+        # session, user, referenced categories, two savepoints, insert,
+        # balances update, dirty months, cache audience, touched categories,
+        # two releases
+        with self.assertNumQueries(12):
+            response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 201, response.json())
+        self.assertEqual(len(response.json()), 30)
+        self.assertEqual(FinancialEntry.objects.filter(user=self.user).count(), 30)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        data = [
+            self.entry_data(self.categories[0]),
+            self.entry_data(self.other_category),
+            {**self.entry_data(self.categories[1]), "amount": "abc"},
+        ]
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            [
+                {},
+                {"non_field_errors": ["This budget doesn't belong to you."]},
+                {"amount": ["A valid number is required."]},
+            ],
+        )
+        self.assertFalse(FinancialEntry.objects.exists())
+
+    def test_bulk_create_requires_list(self):
+        response = self.client.post(self.url, self.entry_data(self.categories[0]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_update(self):
+        entries = [
+            FinancialEntry.objects.create(user=self.user, **self.entry_fields(c))
+            for c in self.categories
+        ]
+        data = [
+            {"id": entry.pk, **self.entry_data(self.categories[0], amount=99)}
+            for entry in entries
+        ]
+        response = self.client.put(self.url, data)
+        self.assertEqual(response.status_code, 200, response.json())
+        self.assertEqual(
+            set(FinancialEntry.objects.values_list("amount", "category")),
+            {(99, self.categories[0].pk)},
+        )
+
+    def test_bulk_update_unknown_id(self):
+        data = [{"id": 1000, **self.entry_data(self.categories[0])}]
+        response = self.client.put(self.url, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{"id": ["Not found."]}])
+
+    def test_bulk_update_duplicate_id(self):
+        entry = FinancialEntry.objects.create(
+            user=self.user, **self.entry_fields(self.categories[0])
+        )
+        data = [
+            {"id": entry.pk, **self.entry_data(self.categories[0], amount=amount)}
+            for amount in (20, 30)
+        ]
+        response = self.client.put(self.url, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {"id": ["Duplicate id."]}])
+        entry.refresh_from_db()
+        self.assertEqual(entry.amount, 10)
+        self.assertEqual(list(CategoryBalance.inconsistencies()), [])
+
+    def test_bulk_delete(self):
+        entries = [
+            FinancialEntry.objects.create(user=self.user, **self.entry_fields(c))
+            for c in self.categories
+        ]
+        response = self.client.delete(self.url, [entry.pk for entry in entries[:2]])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(FinancialEntry.objects.all()), [entries[2]])
+
+    def test_bulk_delete_unknown_id(self):
+        response = self.client.delete(self.url, [1000])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{"id": ["Not found."]}])
+
+    def entry_fields(self, category):
+        return {
+            "category": category,
+            "amount": 10,
+            "description": "test",
+            "entry_type": FinancialEntry.EXPENSE,
+            "date": "2021-01-01T00:00:00Z",
+        }
@@ -0,0 +1,229 @@
+import io
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.importers import StatementError, parse_statement
+from core.models import Budget, Category, FinancialEntry
+
+CSV_STATEMENT = b"""date,amount,description,balance
+2021-01-05,-10.50,LIDL Warszawa,100
+2021-01-06T10:00:00Z,1000.00,Salary ACME,1100
+2021-01-07,-3.20,Bus ticket,1096.80
+"""
+
+OFX_STATEMENT = b"""OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20210105120000[-5:EST]
+<TRNAMT>-10.50
+<NAME>LIDL
+<MEMO>Warszawa
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20210106<TRNAMT>1000.00<NAME>Salary</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TestParseStatement(TestCase):
+    def test_parse_csv(self):
+        rows = list(parse_statement(io.BytesIO(CSV_STATEMENT), "csv"))
+        self.assertEqual(
+            [(row.amount, row.description) for row in rows],
+            [
+                (Decimal("-10.50"), "LIDL Warszawa"),
+                (Decimal("1000.00"), "Salary ACME"),
+                (Decimal("-3.20"), "Bus ticket"),
+            ],
+        )
+        self.assertEqual(rows[1].date.isoformat(), "2021-01-06T10:00:00+00:00")
+
+    def test_parse_ofx(self):
+        rows = list(parse_statement(io.BytesIO(OFX_STATEMENT), "ofx"))
+        self.assertEqual(
+            [(row.amount, row.description) for row in rows],
+            [(Decimal("-10.50"), "LIDL Warszawa"), (Decimal("1000.00"), "Salary")],
+        )
+        self.assertEqual(rows[0].date, datetime(2021, 1, 5, 17, tzinfo=timezone.utc))
+
+    def test_parse_ofx_date_offsets(self):
+        for value, expected in (
+            ("20210131203000[-5:EST]", datetime(2021, 2, 1, 1, 30)),
+            ("20210131203000.123[-5]", datetime(2021, 2, 1, 1, 30)),
+            ("20210201023000[+5.5:IST]", datetime(2021, 1, 31, 21)),
+            ("20210201[+1:CET]", datetime(2021, 1, 31, 23)),
+            ("20210201120000", datetime(2021, 2, 1, 12)),
+        ):
+            statement = f"<STMTTRN><DTPOSTED>{value}<TRNAMT>1<NAME>a</STMTTRN>"
+            rows = list(parse_statement(io.BytesIO(statement.encode()), "ofx"))
+            self.assertEqual(rows[0].date, expected.replace(tzinfo=timezone.utc))
+
+        statement = b"<STMTTRN><DTPOSTED>20210201[+30:XX]<TRNAMT>1<NAME>a</STMTTRN>"
+        with self.assertRaisesMessage(StatementError, "Invalid date"):
+            list(parse_statement(io.BytesIO(statement), "ofx"))
+
+    def test_parse_is_lazy(self):
+        rows = parse_statement(io.BytesIO(CSV_STATEMENT + b"bad,row,here,0\n"), "csv")
+        self.assertEqual(next(rows).description, "LIDL Warszawa")
+
+    def test_parse_invalid_row(self):
+        rows = parse_statement(io.BytesIO(b"date,amount,description\nx,1,a\n"), "csv")
+        with self.assertRaisesMessage(StatementError, "Row 1: Invalid date: 'x'"):
+            list(rows)
+
+    def test_parse_invalid_amounts(self):
+        for amount, message in (
+            ("123456789012345.678", "Ensure that there are no more than 10 digits"),
+            ("123456789.5", "Ensure that there are no more than 8 digits before"),
+            ("1.005", "Ensure that there are no more than 2 decimal places."),
+        ):
+            statement = f"date,amount,description\n2021-01-01,{amount},a\n"
+            rows = parse_statement(io.BytesIO(statement.encode()), "csv")
+            with self.assertRaisesMessage(
+                StatementError, f"Row 1: Invalid amount '{amount}': {message}"
+            ):
+                list(rows)
+
+    def test_parse_trailing_zeros(self):
+        statement = b"date,amount,description\n2021-01-01,-12.500,a\n"
+        rows = list(parse_statement(io.BytesIO(statement), "csv"))
+        self.assertEqual(rows[0].amount, Decimal("-12.5"))
+
+    def test_parse_missing_columns(self):
+        with self.assertRaisesMessage(StatementError, "Missing columns: amount"):
+            list(parse_statement(io.BytesIO(b"date,description\n"), "csv"))
+
+
+class TestImportBase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.budget = Budget.objects.create(user=self.user, name="test")
+        self.other = Category.objects.create(
+            user=self.user, name="other", budget=self.budget
+        )
+        self.groceries = Category.objects.create(
+            user=self.user, name="groceries", budget=self.budget
+        )
+
+    def assertImported(self):
+        self.assertEqual(
+            list(
+                FinancialEntry.objects.order_by("date").values_list(
+                    "category__name", "amount", "entry_type"
+                )
+            ),
+            [
+                ("groceries", Decimal("10.50"), FinancialEntry.EXPENSE),
+                ("other", Decimal("1000.00"), FinancialEntry.INCOME),
+                ("other", Decimal("3.20"), FinancialEntry.EXPENSE),
+            ],
+        )
+
+
+class TestImportStatementCommand(TestImportBase):
+    def test_import_csv(self):
+        stdout = io.StringIO()
+        with tempfile.NamedTemporaryFile(suffix=".csv") as statement:
+            statement.write(CSV_STATEMENT)
+            statement.flush()
+            call_command(
+                "import_statement",
+                statement.name,
+                budget=self.budget.pk,
+                default_category="other",
+                rule=["lidl|biedronka=groceries"],
+                chunk_size=2,
+                stdout=stdout,
+            )
+        self.assertImported()
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            ["2 entries imported...", "3 entries imported...", "Imported 3 entries."],
+        )
+
+    def test_import_unknown_category(self):
+        with self.assertRaisesMessage(CommandError, "Unknown categories: food"):
+            call_command(
+                "import_statement",
+                "statement.csv",
+                budget=self.budget.pk,
+                default_category="food",
+            )
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestImportStatementView(TestImportBase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("budgets-import-statement", args=[self.budget.pk])
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_import_csv(self):
+        response = self.client.post(
+            self.url,
+            {
+                "file": SimpleUploadedFile("statement.csv", CSV_STATEMENT),
+                "default_category": "other",
+                "rules": '{"lidl": "groceries"}',
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {"imported": 3})
+        self.assertImported()
+
+    def test_import_invalid_statement(self):
+        response = self.client.post(
+            self.url,
+            {
+                "file": SimpleUploadedFile("statement.csv", CSV_STATEMENT + b"x,1,a,0"),
+                "default_category": "other",
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), ["Row 4: Invalid date: 'x'"])
+        self.assertFalse(FinancialEntry.objects.exists())
+
+    def test_import_amount_out_of_range(self):
+        for amount in (b"123456789012345.678", b"1.005"):
+            response = self.client.post(
+                self.url,
+                {
+                    "file": SimpleUploadedFile(
+                        "statement.csv", CSV_STATEMENT + b"2021-01-08,%s,a,0" % amount
+                    ),
+                    "default_category": "other",
+                },
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertTrue(response.json()[0].startswith("Row 4: Invalid amount"))
+        self.assertFalse(FinancialEntry.objects.exists())
+
+    def test_import_into_shared_budget(self):
+        visitor = User.objects.create_user(username="visitor")
+        self.budget.shared_with_users.create(owner=self.user, visitor=visitor)
+        self.client.force_authenticate(visitor)
+        response = self.client.post(
+            self.url,
+            {
+                "file": SimpleUploadedFile("statement.csv", CSV_STATEMENT),
+                "default_category": "other",
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,158 @@
+import json
+import logging
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.instrumentation import registry
+from core.models import Budget, Category, FinancialEntry
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=([\d.]+), total;dur=[\d.]+$'
+)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR", INSTRUMENTATION_ENABLED=True)
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        # Keep the request log out of the test output; assertLogs lowers it.
+        logger = logging.getLogger("core.instrumentation")
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.WARNING)
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="budget")
+        category = Category.objects.create(user=self.user, name="food", budget=budget)
+        FinancialEntry.objects.create(
+            user=self.user,
+            category=category,
+            amount=10,
+            description="test",
+            entry_type=FinancialEntry.EXPENSE,
+            date="2021-01-01T00:00:00Z",
+        )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("budgets-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = SERVER_TIMING.match(response["Server-Timing"])
+        self.assertIsNotNone(timing, response["Server-Timing"])
+        self.assertEqual(int(timing.group(1)), len(queries))
+        self.assertGreater(float(timing.group(2)), 0)
+
+    @override_settings(FAST_LIST_SERIALIZERS=True)
+    def test_fast_lists_time_rendering(self):
+        for view in ("financial-entries-list", "categories-list"):
+            response = self.client.get(reverse(view))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertGreater(
+                registry.totals[view]["serializer_duration_seconds_total"], 0
+            )
+
+    def test_async_view_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("async-categories-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = SERVER_TIMING.match(response["Server-Timing"])
+        self.assertEqual(int(timing.group(1)), len(queries))
+
+    def test_log(self):
+        with self.assertLogs("core.instrumentation", "INFO") as logs:
+            self.client.get(reverse("financial-entries-list"))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "financial-entries-list")
+        self.assertEqual(record["path"], "/financial-entries/")
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["db_queries"], 0)
+        self.assertEqual(
+            set(record),
+            {
+                "method",
+                "path",
+                "view",
+                "status",
+                "duration_ms",
+                "db_queries",
+                "db_ms",
+                "serializer_ms",
+            },
+        )
+
+    def test_metrics(self):
+        self.client.get(reverse("budgets-list"))
+        self.client.get(reverse("budgets-list"))
+        self.client.get("/missing/")
+
+        User.objects.create_user(username="staff", password="test", is_staff=True)
+        self.client.login(username="staff", password="test")
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        metrics = response.content.decode()
+        self.assertIn(
+            'http_requests_total{view="budgets-list",method="GET",status="200"} 2',
+            metrics,
+        )
+        self.assertIn(
+            'http_requests_total{view="unmatched",method="GET",status="404"} 1',
+            metrics,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{view="budgets-list",le="+Inf"} 2',
+            metrics,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{view="budgets-list"} 2', metrics
+        )
+        self.assertRegex(metrics, r'db_queries_total\{view="budgets-list"\} \d+')
+
+    def test_metrics_need_staff(self):
+        self.assertEqual(
+            self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            APIClient().get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(client.get(reverse("metrics")).status_code, status.HTTP_200_OK)
+        client.credentials(HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(
+            client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    def test_empty_metrics_token_is_refused(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(
+            client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        client = APIClient()
+        client.login(username="test", password="test")
+
+        response = client.get(reverse("budgets-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(client.get(reverse("metrics")).status_code, 404)
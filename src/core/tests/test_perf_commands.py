@@ -0,0 +1,123 @@
+import io
+import json
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.models import (
+    Budget,
+    BudgetUser,
+    Category,
+    CategoryBalance,
+    DirtyMonth,
+    FinancialEntry,
+    MonthlyRollup,
+)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestPerfCommands(TestCase):
+    def seed(self):
+        call_command(
+            "seed_perf",
+            users=3,
+            budgets=2,
+            categories=2,
+            shares=1,
+            entries=200,
+            batch_size=50,
+            stdout=io.StringIO(),
+        )
+
+    def test_seed_perf(self):
+        self.seed()
+
+        self.assertEqual(User.objects.filter(username__startswith="perf_").count(), 3)
+        self.assertEqual(Budget.objects.count(), 6)
+        self.assertEqual(Category.objects.count(), 12)
+        self.assertEqual(BudgetUser.objects.count(), 3)
+        self.assertEqual(FinancialEntry.objects.count(), 200)
+        self.assertEqual(CategoryBalance.objects.count(), 12)
+        self.assertEqual(list(CategoryBalance.inconsistencies()), [])
+        self.assertFalse(DirtyMonth.objects.exists())
+        self.assertEqual(
+            sum(MonthlyRollup.objects.values_list("count", flat=True)), 200
+        )
+        client = APIClient()
+        self.assertTrue(client.login(username="perf_0", password="pw"))
+        user = User.objects.get(username="perf_0")
+        client.credentials(HTTP_AUTHORIZATION=f"Token {user.auth_token.key}")
+        self.assertEqual(client.get("/budgets/").status_code, 200)
+
+    def test_rebuild_matches_refresh(self):
+        self.seed()
+        fields = ("budget", "category", "month", "entry_type", "total", "count")
+        rebuilt = set(MonthlyRollup.objects.values_list(*fields))
+        DirtyMonth.objects.bulk_create(
+            DirtyMonth(category_id=category_id, month=month)
+            for category_id, month in MonthlyRollup.objects.values_list(
+                "category", "month"
+            ).distinct()
+        )
+        MonthlyRollup.refresh()
+
+        self.assertEqual(set(MonthlyRollup.objects.values_list(*fields)), rebuilt)
+
+    def test_benchmark(self):
+        self.seed()
+        with tempfile.NamedTemporaryFile("w+", suffix=".json") as output:
+            call_command(
+                "benchmark",
+                user="perf_0",
+                iterations=2,
+                output=output.name,
+                stdout=io.StringIO(),
+            )
+            results = json.load(output)
+
+        self.assertEqual(
+            set(results),
+            {
+                "financial-entries-list",
+                "financial-entries-detail",
+                "categories-list",
+                "categories-detail",
+                "categories-entries",
+                "budgets-list",
+                "budgets-detail",
+                "budgets-summary",
+                "shared-budgets-list",
+                "shared-budgets-detail",
+                "users-list",
+                "users-detail",
+                "budget-users-list",
+                "budget-users-detail",
+            },
+        )
+        for result in results.values():
+            self.assertEqual(result["status"], 200)
+            self.assertGreater(result["queries"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+        baseline = {
+            name: {**result, "queries": result["queries"] - 1, "p95_ms": 1000}
+            for name, result in results.items()
+        }
+        with tempfile.NamedTemporaryFile("w+", suffix=".json") as file:
+            json.dump(baseline, file)
+            file.flush()
+            with self.assertRaisesMessage(CommandError, "budgets-list: "):
+                call_command(
+                    "benchmark",
+                    user="perf_0",
+                    iterations=1,
+                    baseline=file.name,
+                    stdout=io.StringIO(),
+                )
+
+    def test_benchmark_unknown_user(self):
+        with self.assertRaisesMessage(CommandError, "Unknown user: nobody"):
+            call_command("benchmark", user="nobody", stdout=io.StringIO())
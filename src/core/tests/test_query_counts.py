@@ -0,0 +1,305 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Budget, BudgetUser, Category, FinancialEntry, Tombstone
+from core.tests.mixins import QueryCountMixin
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestQueryCounts(TestCase):
+    """Every endpoint runs a fixed number of queries regardless of page size.
+
+    Two of the counted queries come from session authentication.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        for i in range(5):
+            budget = Budget.objects.create(user=self.user, name=f"budget_{i}")
+            for j in range(3):
+                category = Category.objects.create(
+                    user=self.user, name=f"category_{j}", budget=budget
+                )
+                for entry_type in (FinancialEntry.INCOME, FinancialEntry.EXPENSE):
+                    FinancialEntry.objects.create(
+                        user=self.user,
+                        category=category,
+                        amount=10,
+                        description="test",
+                        entry_type=entry_type,
+                        date="2021-01-01T00:00:00Z",
+                    )
+        BudgetUser.objects.create(owner=self.user, visitor=self.visitor, budget=budget)
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def assertEndpointQueries(self, num, name, *args):
+        with self.assertNumQueries(num):
+            response = self.client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_financial_entries(self):
+        # session, user, entries (cursor pagination runs no count)
+        self.assertEndpointQueries(3, "financial-entries-list")
+
+    def test_get_financial_entry(self):
+        self.assertEndpointQueries(3, "financial-entries-detail", 1)
+
+    def test_list_categories(self):
+        # session, user, count, categories, prefetched entries
+        self.assertEndpointQueries(5, "categories-list")
+
+    def test_get_category(self):
+        self.assertEndpointQueries(4, "categories-detail", 1)
+
+    def test_list_category_entries(self):
+        # session, user, category, entries
+        self.assertEndpointQueries(4, "categories-entries", 1)
+
+    def test_list_budgets(self):
+        # session, user, count, budgets with owners, shares, categories
+        self.assertEndpointQueries(6, "budgets-list")
+
+    def test_get_budget(self):
+        self.assertEndpointQueries(5, "budgets-detail", 1)
+
+    def test_list_shared_budgets(self):
+        self.client.login(username="visitor", password="test")
+        self.assertEndpointQueries(6, "shared-budgets-list")
+
+    def test_list_budget_users(self):
+        # session, user, count, shares with owner, visitor and budget
+        self.assertEndpointQueries(4, "budget-users-list")
+
+    def test_get_budget_user(self):
+        self.assertEndpointQueries(3, "budget-users-detail", 1)
+
+    def test_list_users(self):
+        self.assertEndpointQueries(4, "users-list")
+
+    def test_post_financial_entry(self):
+        # session, user, posted user, category with budget, savepoint, insert,
+        # balance update, dirty month, cache audience, touched category, release
+        with self.assertNumQueries(11):
+            response = self.client.post(
+                reverse("financial-entries-list"),
+                {
+                    "user": self.user.id,
+                    "category": reverse("categories-detail", args=[1]),
+                    "amount": "10.00",
+                    "description": "test",
+                    "entry_type": FinancialEntry.INCOME,
+                    "date": "2021-01-01T00:00:00Z",
+                },
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR", RESPONSE_CACHE_TIMEOUT=0)
+class TestQueryCountsDoNotGrow(QueryCountMixin, TestCase):
+    """Every list and detail endpoint runs as many queries for 100 rows as for 1."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        self.budget = Budget.objects.create(user=self.user, name="budget")
+        self.category = Category.objects.create(
+            user=self.user, name="category", budget=self.budget
+        )
+        self.entry = self.create_entry(self.category)
+        self.share = BudgetUser.objects.create(
+            owner=self.user, visitor=self.visitor, budget=self.budget
+        )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+        self.users = 0
+
+    def create_entry(self, category, date="2021-01-01T00:00:00Z"):
+        return FinancialEntry.objects.create(
+            user=category.user,
+            category=category,
+            amount=10,
+            description="test",
+            entry_type=FinancialEntry.EXPENSE,
+            date=date,
+        )
+
+    def create_user(self):
+        self.users += 1
+        return User.objects.create(username=f"user_{self.users}")
+
+    def add_entries(self, count):
+        FinancialEntry.objects.bulk_create(
+            FinancialEntry(
+                user=self.user,
+                category=self.category,
+                amount=10,
+                description="test",
+                entry_type=FinancialEntry.INCOME,
+                date="2021-01-01T00:00:00Z",
+            )
+            for _ in range(count)
+        )
+
+    def add_categories(self, count):
+        for i in range(count):
+            category = Category.objects.create(
+                user=self.user, name=f"category_{i}", budget=self.budget
+            )
+            self.create_entry(category, date=f"{2000 + i}-01-01T00:00:00Z")
+
+    def add_budgets(self, count, owner=None):
+        """Budgets with a category, an entry and a share with a new visitor."""
+        for i in range(count):
+            user = owner or self.create_user()
+            budget = Budget.objects.create(user=user, name=f"budget_{i}")
+            category = Category.objects.create(
+                user=user, name="category", budget=budget
+            )
+            self.create_entry(category)
+            visitor = self.visitor if owner is None else self.create_user()
+            BudgetUser.objects.create(owner=user, visitor=visitor, budget=budget)
+
+    def add_owned_budgets(self, count):
+        self.add_budgets(count, owner=self.user)
+
+    def add_shares(self, count):
+        for _ in range(count):
+            BudgetUser.objects.create(
+                owner=self.user, visitor=self.create_user(), budget=self.budget
+            )
+
+    def add_users(self, count):
+        for _ in range(count):
+            self.create_user()
+
+    def test_list_financial_entries(self):
+        self.assertConstantQueries(
+            reverse("financial-entries-list") + "?page_size=100", self.add_entries
+        )
+
+    def assertConstantDeleteQueries(self, delete_rows, rows=(1, 100)):
+        """Like ``assertConstantQueries`` for ``delete_rows(n)``, which deletes n rows."""
+        counts = []
+        for count in rows:
+            with CaptureQueriesContext(connection) as queries:
+                response = delete_rows(count)
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            counts.append(len(queries))
+        self.assertEqual(
+            counts[0], counts[1], f"{counts} queries for {list(rows)} rows"
+        )
+
+    def test_bulk_delete_financial_entries(self):
+        def delete_rows(count):
+            self.add_entries(count)
+            ids = list(
+                FinancialEntry.objects.order_by("-pk").values_list("pk", flat=True)
+            )[:count]
+            return self.client.delete(
+                reverse("financial-entries-bulk"), ids, format="json"
+            )
+
+        self.assertConstantDeleteQueries(delete_rows)
+        self.assertEqual(
+            Tombstone.objects.filter(model=Tombstone.FINANCIAL_ENTRY).count(), 101
+        )
+
+    def test_delete_category(self):
+        def delete_rows(count):
+            self.category = Category.objects.create(
+                user=self.user, name="deleted", budget=self.budget
+            )
+            self.add_entries(count)
+            url = reverse("categories-detail", args=[self.category.pk])
+            return self.client.delete(url)
+
+        self.assertConstantDeleteQueries(delete_rows)
+        self.assertEqual(
+            Tombstone.objects.filter(model=Tombstone.FINANCIAL_ENTRY).count(), 101
+        )
+
+    def test_get_financial_entry(self):
+        url = reverse("financial-entries-detail", args=[self.entry.pk])
+        self.assertConstantQueries(url, self.add_entries)
+
+    def test_list_categories(self):
+        self.assertConstantQueries(reverse("categories-list"), self.add_categories)
+
+    def test_list_compact_categories(self):
+        self.assertConstantQueries(
+            reverse("categories-list") + "?compact=true", self.add_categories
+        )
+
+    def test_list_category_entries(self):
+        url = reverse("categories-entries", args=[self.category.pk])
+        self.assertConstantQueries(url + "?page_size=100", self.add_entries)
+
+    def test_list_categories_entries(self):
+        self.assertConstantQueries(reverse("categories-list"), self.add_entries)
+
+    def test_get_category(self):
+        url = reverse("categories-detail", args=[self.category.pk])
+        self.assertConstantQueries(url, self.add_entries)
+
+    def test_list_budgets(self):
+        self.assertConstantQueries(reverse("budgets-list"), self.add_owned_budgets)
+
+    def test_get_budget(self):
+        url = reverse("budgets-detail", args=[self.budget.pk])
+        self.assertConstantQueries(url, self.add_categories)
+
+    def test_get_budget_shares(self):
+        url = reverse("budgets-detail", args=[self.budget.pk])
+        self.assertConstantQueries(url, self.add_shares)
+
+    def test_budget_summary(self):
+        url = reverse("budgets-summary", args=[self.budget.pk])
+        self.assertConstantQueries(url, self.add_categories)
+
+    def test_list_shared_budgets(self):
+        self.client.login(username="visitor", password="test")
+        self.assertConstantQueries(reverse("shared-budgets-list"), self.add_budgets)
+
+    def test_get_shared_budget(self):
+        self.client.login(username="visitor", password="test")
+        url = reverse("shared-budgets-detail", args=[self.budget.pk])
+        self.assertConstantQueries(url, self.add_categories)
+
+    def test_list_users(self):
+        self.assertConstantQueries(reverse("users-list"), self.add_users)
+
+    def test_get_user(self):
+        url = reverse("users-detail", args=[self.user.pk])
+        self.assertConstantQueries(url, self.add_owned_budgets)
+
+    def test_list_budget_users(self):
+        self.assertConstantQueries(reverse("budget-users-list"), self.add_shares)
+
+    def test_get_budget_user(self):
+        url = reverse("budget-users-detail", args=[self.share.pk])
+        self.assertConstantQueries(url, self.add_shares)
+
+    def test_sync(self):
+        self.assertConstantQueries(reverse("sync"), self.add_owned_budgets)
+
+    def test_async_list_financial_entries(self):
+        url = reverse("async-financial-entries-list") + "?page_size=100"
+        self.assertConstantQueries(url, self.add_entries)
+
+    def test_async_list_categories(self):
+        self.assertConstantQueries(
+            reverse("async-categories-list"), self.add_categories
+        )
+
+    def test_async_budget_summary(self):
+        url = reverse("async-budgets-summary", args=[self.budget.pk])
+        self.assertConstantQueries(url, self.add_categories)
@@ -0,0 +1,148 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.relations import Hyperlink
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Budget, Category, FinancialEntry
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+DATA = {
+    "amount": "10.50",
+    "date": "2021-01-01T10:30:00.123456Z",
+    "url": Hyperlink("http://testserver/budgets/1/", None),
+    "error": ErrorDetail("Invalid.", code="invalid"),
+    "lazy": gettext_lazy("This field is required."),
+    "decimal": Decimal("10.50"),
+    "datetimes": [
+        datetime(2021, 1, 1, 10, 30, tzinfo=timezone.utc),
+        datetime(2021, 1, 1, 10, 30, 0, 5, tzinfo=timezone.utc),
+        datetime(2021, 1, 1, 10, 30, tzinfo=timezone(timedelta(hours=2))),
+        datetime(2021, 1, 1, 10, 30),
+    ],
+    "date_only": date(2021, 1, 1),
+    "time": time(10, 30, 15),
+    "timedelta": timedelta(minutes=90),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "text": 'ünïcode "quoted" \\ / \n\t\x01     \U0001f600',
+    "numbers": [0, -1, 2**63 - 1, 1.5, True, False, None],
+    "tuple": (1, 2),
+    "generator": (i for i in range(3)),
+    1: "integer key",
+}
+
+
+class TestORJSONRenderer(SimpleTestCase):
+    def assertSameBytes(self, data, media_type=None, context=None):
+        expected = JSONRenderer().render(data, media_type, context)
+        self.assertEqual(ORJSONRenderer().render(data, media_type, context), expected)
+
+    def test_same_bytes(self):
+        data = {key: value for key, value in DATA.items() if key != "generator"}
+        self.assertSameBytes(data)
+
+    def test_generator(self):
+        rendered = ORJSONRenderer().render({"generator": (i for i in range(3))})
+        self.assertEqual(rendered, b'{"generator":[0,1,2]}')
+
+    def test_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent_falls_back(self):
+        data = {"amount": "10.50", "list": [1, 2]}
+        self.assertSameBytes(data, "application/json; indent=4")
+        self.assertSameBytes(data, None, {"indent": 2})
+
+    def test_big_integer_falls_back(self):
+        self.assertSameBytes({"big": 2**64})
+
+    def test_without_orjson(self):
+        data = {key: value for key, value in DATA.items() if key != "generator"}
+        with mock.patch("core.renderers.orjson", None):
+            self.assertSameBytes(data)
+
+
+class TestORJSONParser(SimpleTestCase):
+    def parse(self, parser, content):
+        return parser.parse(io.BytesIO(content), parser_context={})
+
+    def test_same_data(self):
+        content = '{"amount": 10.50, "text": "ünïcode", "list": [1, null, true]}'
+        content = content.encode()
+        self.assertEqual(
+            self.parse(ORJSONParser(), content), self.parse(JSONParser(), content)
+        )
+
+    def test_big_integer(self):
+        self.assertEqual(
+            self.parse(ORJSONParser(), b'{"big": 1%s}' % (b"0" * 30)), {"big": 10**30}
+        )
+
+    def test_errors(self):
+        for content in (b"{", b'{"amount": NaN}', b""):
+            with self.assertRaises(ParseError) as expected:
+                self.parse(JSONParser(), content)
+            with self.assertRaises(ParseError) as error:
+                self.parse(ORJSONParser(), content)
+            self.assertEqual(str(error.exception), str(expected.exception))
+
+    def test_other_encoding(self):
+        content = '{"text": "ünïcode"}'.encode("utf-16")
+        parsed = ORJSONParser().parse(
+            io.BytesIO(content), parser_context={"encoding": "utf-16"}
+        )
+        self.assertEqual(parsed, {"text": "ünïcode"})
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestORJSONRendererResponses(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username="test", password="test")
+        budget = Budget.objects.create(user=self.user, name="budget")
+        category = Category.objects.create(user=self.user, name="food", budget=budget)
+        for i in range(3):
+            FinancialEntry.objects.create(
+                user=self.user,
+                category=category,
+                amount=Decimal("10.05") * i,
+                description=f"entry {i}",
+                entry_type=FinancialEntry.EXPENSE,
+                date=f"2021-01-0{i + 1}T10:30:00.00{i}Z",
+            )
+        self.client = APIClient()
+        self.client.login(username="test", password="test")
+
+    def test_responses(self):
+        for url in (
+            reverse("financial-entries-list"),
+            reverse("categories-list"),
+            reverse("budgets-list"),
+            reverse("budgets-summary", args=[1]),
+            reverse("sync"),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_post(self):
+        response = self.client.post(
+            reverse("financial-entries-list"),
+            b'{"category": "http://testserver/categories/1/", "amount": 12.5, '
+            b'"description": "\xc3\xbc", "entry_type": "Income", '
+            b'"date": "2021-01-01T00:00:00Z", "user": 1}',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["amount"], "12.50")
+        self.assertEqual(response.json()["description"], "ü")
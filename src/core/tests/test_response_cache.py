@@ -0,0 +1,104 @@
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Budget, BudgetUser, Category, FinancialEntry
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestResponseCache(TestCase):
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.owner = User.objects.create_user(username="owner", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        self.budget = Budget.objects.create(user=self.owner, name="test")
+        self.category = Category.objects.create(
+            user=self.owner, name="food", budget=self.budget
+        )
+        BudgetUser.objects.create(
+            owner=self.owner, visitor=self.visitor, budget=self.budget
+        )
+        self.client = APIClient()
+
+    def get(self, user, name):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_list_served_from_cache(self):
+        first = self.get(self.owner, "categories-list")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.owner, "categories-list"), first)
+        self.client.force_authenticate(self.owner)
+        # Query parameters are part of the key.
+        with self.assertNumQueries(3):
+            self.client.get(reverse("categories-list"), {"search": "food"})
+
+    def test_cached_per_user(self):
+        self.assertEqual(self.get(self.owner, "shared-budgets-list")["count"], 0)
+        self.assertEqual(self.get(self.visitor, "shared-budgets-list")["count"], 1)
+
+    def test_owner_changes_invalidate_visitors(self):
+        self.get(self.visitor, "categories-list")
+        self.get(self.visitor, "shared-budgets-list")
+        Category.objects.create(user=self.owner, name="rent", budget=self.budget)
+        self.assertEqual(self.get(self.visitor, "categories-list")["count"], 2)
+
+        self.budget.name = "renamed"
+        self.budget.save()
+        budgets = self.get(self.visitor, "shared-budgets-list")["results"]
+        self.assertEqual(budgets[0]["name"], "renamed")
+
+    def test_entries_invalidate_categories(self):
+        self.assertEqual(
+            self.get(self.owner, "categories-list")["results"][0]["bilance"], 0
+        )
+        FinancialEntry.objects.bulk_create(
+            [
+                FinancialEntry(
+                    user=self.owner,
+                    category=self.category,
+                    amount=10,
+                    description="test",
+                    entry_type=FinancialEntry.EXPENSE,
+                    date="2021-01-01T00:00:00Z",
+                )
+            ]
+        )
+        categories = self.get(self.visitor, "categories-list")["results"]
+        self.assertEqual(categories[0]["bilance"], -10)
+        categories = self.get(self.owner, "categories-list")["results"]
+        self.assertEqual(categories[0]["bilance"], -10)
+
+        FinancialEntry.objects.all().delete()
+        categories = self.get(self.owner, "categories-list")["results"]
+        self.assertEqual(categories[0]["bilance"], 0)
+
+    def test_unsharing_invalidates_visitor(self):
+        self.assertEqual(self.get(self.visitor, "budgets-list")["count"], 1)
+        BudgetUser.objects.all().delete()
+        self.assertEqual(self.get(self.visitor, "budgets-list")["count"], 0)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            with override_settings(
+                CACHES={"default": {"BACKEND": backend, "LOCATION": location}}
+            ):
+                self.get(self.owner, "budgets-list")
+                Budget.objects.create(user=self.owner, name="other")
+                self.assertEqual(self.get(self.owner, "budgets-list")["count"], 2)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.get(self.owner, "categories-list")
+        self.client.force_authenticate(self.owner)
+        with self.assertNumQueries(3):
+            self.client.get(reverse("categories-list"))
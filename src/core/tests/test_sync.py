@@ -0,0 +1,176 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import sync
+from core.models import Budget, BudgetUser, Category, FinancialEntry
+from core.sync import SYNC_OVERLAP, decode_token
+
+LONG_AGO = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@override_settings(MEDIA_ROOT="TEST_DIR")
+class TestSync(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user(username="owner", password="test")
+        self.visitor = User.objects.create_user(username="visitor", password="test")
+        self.budget = Budget.objects.create(user=self.owner, name="shared")
+        self.other_budget = Budget.objects.create(user=self.owner, name="private")
+        self.category = Category.objects.create(
+            user=self.owner, name="food", budget=self.budget
+        )
+        self.other_category = Category.objects.create(
+            user=self.owner, name="rent", budget=self.other_budget
+        )
+        self.entry = self.create_entry(self.category)
+        self.other_entry = self.create_entry(self.other_category)
+        self.share = BudgetUser.objects.create(
+            owner=self.owner, visitor=self.visitor, budget=self.budget
+        )
+        for model in (Budget, Category, FinancialEntry, BudgetUser):
+            model.objects.update(updated_at=LONG_AGO)
+        self.client = APIClient()
+        self.url = reverse("sync")
+
+    def create_entry(self, category, amount=10):
+        return FinancialEntry.objects.create(
+            user=self.owner,
+            category=category,
+            amount=amount,
+            description="test",
+            entry_type=FinancialEntry.EXPENSE,
+            date="2021-01-01T00:00:00Z",
+        )
+
+    def sync(self, user, since=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, {"since": since} if since else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_full_sync(self):
+        data = self.sync(self.visitor)
+        self.assertEqual([row["name"] for row in data["budgets"]], ["shared"])
+        self.assertEqual([row["name"] for row in data["categories"]], ["food"])
+        self.assertEqual(
+            [row["id"] for row in data["financial_entries"]], [self.entry.pk]
+        )
+        self.assertEqual(data["budget_users"], [])
+        self.assertEqual(
+            data["deleted"],
+            {"budget": [], "category": [], "financial_entry": [], "budget_user": []},
+        )
+        self.assertEqual(len(self.sync(self.owner)["budget_users"]), 1)
+
+    def test_delta_sync(self):
+        token = self.sync(self.visitor)["token"]
+        self.assertEqual(self.sync(self.visitor, token)["financial_entries"], [])
+
+        self.entry.amount = 20
+        self.entry.save()
+        created = self.create_entry(self.category, 5)
+        self.create_entry(self.other_category)
+        Category.objects.create(user=self.owner, name="rent", budget=self.budget)
+        category_pk = self.category.pk
+        self.category.delete()
+
+        data = self.sync(self.visitor, token)
+        # The budget lists its categories.
+        self.assertEqual([row["name"] for row in data["budgets"]], ["shared"])
+        self.assertEqual([row["name"] for row in data["categories"]], ["rent"])
+        self.assertEqual(data["financial_entries"], [])
+        self.assertEqual(data["deleted"]["category"], [category_pk])
+        self.assertEqual(
+            data["deleted"]["financial_entry"], sorted([self.entry.pk, created.pk])
+        )
+        self.assertNotEqual(data["token"], token)
+
+    def test_entry_changes_return_their_category(self):
+        token = self.sync(self.visitor)["token"]
+        self.entry.amount = 25
+        self.entry.save()
+        data = self.sync(self.visitor, token)
+        self.assertEqual(
+            [(row["name"], row["bilance"]) for row in data["categories"]],
+            [("food", -25)],
+        )
+        self.assertEqual(
+            [row["id"] for row in data["financial_entries"]], [self.entry.pk]
+        )
+        self.assertEqual(data["budgets"], [])
+
+        token = data["token"]
+        FinancialEntry.objects.filter(pk=self.entry.pk).delete()
+        data = self.sync(self.visitor, token)
+        self.assertEqual(data["categories"][0]["bilance"], 0)
+        self.assertEqual(data["deleted"]["financial_entry"], [self.entry.pk])
+
+    def test_categories_leave_out_their_entries(self):
+        for _ in range(3):
+            self.create_entry(self.category)
+        FinancialEntry.objects.update(updated_at=LONG_AGO)
+        token = self.sync(self.visitor)["token"]
+        self.entry.amount = 20
+        self.entry.save()
+        data = self.sync(self.visitor, token)
+        self.assertNotIn("financial_entries", data["categories"][0])
+        self.assertEqual(len(data["financial_entries"]), 1)
+
+    def test_moved_category_returns_both_budgets(self):
+        token = self.sync(self.owner)["token"]
+        self.category.budget = self.other_budget
+        self.category.save()
+        data = self.sync(self.owner, token)
+        self.assertEqual(
+            sorted(row["name"] for row in data["budgets"]), ["private", "shared"]
+        )
+
+    def test_token_precedes_open_write_transactions(self):
+        started = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        with mock.patch.object(sync, "oldest_open_write", return_value=started):
+            token = self.sync(self.visitor)["token"]
+        self.assertEqual(decode_token(token), started - SYNC_OVERLAP)
+
+    def test_moved_entry_is_deleted_for_old_budget(self):
+        token = self.sync(self.visitor)["token"]
+        self.entry.category = self.other_category
+        self.entry.save()
+        data = self.sync(self.visitor, token)
+        self.assertEqual(data["financial_entries"], [])
+        self.assertEqual(data["deleted"]["financial_entry"], [self.entry.pk])
+
+    def test_new_share_returns_whole_budget(self):
+        token = self.sync(self.visitor)["token"]
+        BudgetUser.objects.create(
+            owner=User.objects.create_user(username="other"),
+            visitor=self.visitor,
+            budget=self.other_budget,
+        )
+        data = self.sync(self.visitor, token)
+        self.assertEqual([row["name"] for row in data["budgets"]], ["private"])
+        self.assertEqual(
+            [row["id"] for row in data["financial_entries"]], [self.other_entry.pk]
+        )
+
+    def test_unshare_deletes_budget_for_visitor(self):
+        token = self.sync(self.visitor)["token"]
+        owner_token = self.sync(self.owner)["token"]
+        share_pk = self.share.pk
+        self.share.delete()
+        self.assertEqual(
+            self.sync(self.visitor, token)["deleted"]["budget"], [self.budget.pk]
+        )
+        data = self.sync(self.owner, owner_token)
+        self.assertEqual(data["deleted"]["budget_user"], [share_pk])
+        self.assertEqual(data["deleted"]["budget"], [])
+
+    def test_invalid_token(self):
+        self.client.force_authenticate(self.visitor)
+        response = self.client.get(self.url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,12 +3,14 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken import views
 
+from core import async_views, instrumentation
 from core.views import (
     BudgetUserViewSet,
     BudgetView,
     CategoryViewSet,
     FinancialEntryViewSet,
     SharedBudgetView,
+    SyncView,
     UserViewSet,
 )
 
@@ -25,6 +27,19 @@ router.register("budget-users", BudgetUserViewSet, basename="budget-users")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path(
+        "async/financial-entries/",
+        async_views.financial_entry_list,
+        name="async-financial-entries-list",
+    ),
+    path("async/categories/", async_views.category_list, name="async-categories-list"),
+    path(
+        "async/budgets/<int:pk>/summary/",
+        async_views.budget_summary,
+        name="async-budgets-summary",
+    ),
+    path("metrics/", instrumentation.metrics_view, name="metrics"),
     path("admin/", admin.site.urls),
     path("api-token-auth/", views.obtain_auth_token),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
@@ -0,0 +1,10 @@
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items without materializing ``iterable``."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
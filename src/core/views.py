@@ -1,30 +1,79 @@
+from itertools import zip_longest
+
 from django.contrib.auth.models import User
-from django.db.models import Q
-from rest_framework import filters
+from django.db import transaction
+from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, status
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from core.models import Budget, BudgetUser, Category, FinancialEntry
+from core import exporters
+from core.cache import CachedListMixin, ConditionalGetMixin
+from core.fastpath import FastListMixin
+from core.filters import CategoryFilter, CategoryOrderingFilter, FinancialEntryFilter
+from core.importers import StatementImporter, parse_statement
+from core.models import (
+    Budget,
+    BudgetUser,
+    Category,
+    CategoryQuerySet,
+    FinancialEntry,
+)
+from core.pagination import FinancialEntryCursorPagination, SearchResultsPagination
+from core.reports import budget_summary
 from core.serializers import (
     BudgetSerializer,
+    BudgetSummaryQuerySerializer,
+    BudgetSummarySerializer,
     BudgetUserSerializer,
+    BulkFinancialEntrySerializer,
+    CategoryCompactSerializer,
+    CategoryQuerySerializer,
     CategorySerializer,
+    FinancialEntrySearchQuerySerializer,
     FinancialEntrySerializer,
     SharedBudgetSerializer,
+    StatementImportSerializer,
+    SyncQuerySerializer,
     UserSerializer,
 )
+from core.sync import Changes
+
+EXPORT_URL_PATH = rf"export/(?P<export_format>{'|'.join(exporters.FORMATS)})"
+
+
+def export_entries(queryset, export_format, filename):
+    try:
+        return exporters.export_response(queryset, export_format, filename)
+    except exporters.ExportUnavailable as error:
+        raise NotAcceptable(str(error))
+
+
+BUDGETS_WITH_RELATIONS = Budget.objects.select_related("user").prefetch_related(
+    "shared_with_users", Prefetch("categories", Category.objects.only("id", "budget"))
+)
 
 
-class FinancialEntryViewSet(ModelViewSet):
+class FinancialEntryViewSet(ConditionalGetMixin, FastListMixin, ModelViewSet):
     queryset = FinancialEntry.objects.all()
     serializer_class = FinancialEntrySerializer
+    pagination_class = FinancialEntryCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = FinancialEntryFilter
     authentication_classes = [SessionAuthentication, TokenAuthentication]
 
     def get_queryset(self):
         user = self.request.user
         if user.is_authenticated:
-            filter = Q(user=user) | Q(category__budget__shared_with_users__visitor=user)
-            return self.queryset.filter(filter)
+            return self.queryset.filter(
+                category__budget__in=Budget.objects.visible_to(user)
+            )
         else:
             return self.queryset.none()
 
@@ -34,25 +83,149 @@ class FinancialEntryViewSet(ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["post", "put", "delete"])
+    def bulk(self, request):
+        """Create, replace or delete a list of entries in one transaction.
+
+        Nothing is written unless every item is valid; errors are returned
+        as a list aligned with the submitted items.
+        """
+        if request.method == "DELETE":
+            return self.bulk_destroy(request)
+        data = request.data
+        instances, errors = None, []
+        if request.method == "PUT" and isinstance(data, list):
+            instances, errors = self.get_bulk_instances(data)
+        serializer = BulkFinancialEntrySerializer(
+            instances, data=data, many=True, context=self.get_serializer_context()
+        )
+        if not serializer.is_valid():
+            if not isinstance(serializer.errors, list):
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            errors = [
+                {**item_errors, **serializer_errors}
+                for item_errors, serializer_errors in zip_longest(
+                    errors, serializer.errors, fillvalue={}
+                )
+            ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            serializer.save(user=request.user)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED
+            if request.method == "POST"
+            else status.HTTP_200_OK,
+        )
+
+    @action(detail=False, pagination_class=SearchResultsPagination)
+    def search(self, request):
+        """Entries whose description matches ``?q=``, most relevant first.
+
+        Takes the same filters as the list.
+        """
+        query = FinancialEntrySearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.by_relevance(query.validated_data["q"]))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_path=EXPORT_URL_PATH)
+    def export(self, request, export_format):
+        """Stream the visible entries, filtered, as CSV, NDJSON or Parquet."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_entries(queryset, export_format, "financial-entries")
+
+    def get_bulk_instances(self, data):
+        ids = [item.get("id") if isinstance(item, dict) else None for item in data]
+        found = self.get_queryset().in_bulk([pk for pk in ids if isinstance(pk, int)])
+        instances, errors, seen = [], [], set()
+        for pk in ids:
+            instances.append(found.get(pk))
+            if pk not in found:
+                errors.append({"id": ["Not found."]})
+            elif pk in seen:
+                # The items would share an instance and update the entry twice.
+                errors.append({"id": ["Duplicate id."]})
+            else:
+                errors.append({})
+            seen.add(pk)
+        return instances, errors
+
+    def bulk_destroy(self, request):
+        ids = request.data
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError("Expected a list of entry ids.")
+        queryset = self.get_queryset().filter(pk__in=ids)
+        found = set(queryset.values_list("pk", flat=True))
+        errors = [{} if pk in found else {"id": ["Not found."]} for pk in ids]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            FinancialEntry.objects.filter(pk__in=found).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-class CategoryViewSet(ModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(
+    ConditionalGetMixin, CachedListMixin, FastListMixin, ModelViewSet
+):
+    queryset = Category.objects.prefetch_related("financial_entries")
     serializer_class = CategorySerializer
     lookup_field = "pk"
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = [
-        "name",
-        "financial_entries__date",
-        "financial_entries__entry_type",
-        "financial_entries__amount",
+    filter_backends = [
+        DjangoFilterBackend,
+        filters.SearchFilter,
+        CategoryOrderingFilter,
     ]
-    ordering_fields = ["financial_entries__date", "financial_entries__amount"]
+    filterset_class = CategoryFilter
+    search_fields = ["name"]
+    ordering_fields = ["name", *CategoryQuerySet.AGGREGATES]
     authentication_classes = [SessionAuthentication, TokenAuthentication]
 
     def get_queryset(self):
         user = self.request.user
-        filter = Q(budget__user=user) | Q(budget__shared_with_users__visitor=user)
-        return self.queryset.filter(filter)
+        queryset = self.queryset
+        if self.action == "entries" or self.is_compact():
+            queryset = Category.objects.all()
+        categories = queryset.filter(budget__in=Budget.objects.visible_to(user))
+        if self.action == "entries":
+            return categories
+        return categories.with_bilance()
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return CategoryCompactSerializer
+        return super().get_serializer_class()
+
+    def is_compact(self):
+        """Whether ``?compact=true`` asks to leave the entries out of a read."""
+        if self.action not in ("list", "retrieve"):
+            return False
+        query = CategoryQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data["compact"]
+
+    @action(
+        detail=True, pagination_class=FinancialEntryCursorPagination, filter_backends=[]
+    )
+    def entries(self, request, pk=None):
+        """Entries of this category, filtered and paginated like the entry list."""
+        category = self.get_object()
+        filterset = FinancialEntryFilter(
+            request.query_params,
+            queryset=FinancialEntry.objects.filter(category=category),
+            request=request,
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        queryset = filterset.qs
+        page = self.paginate_queryset(queryset)
+        serializer = FinancialEntrySerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -61,8 +234,8 @@ class CategoryViewSet(ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class BudgetView(ModelViewSet):
-    queryset = Budget.objects.all()
+class BudgetView(ConditionalGetMixin, CachedListMixin, ModelViewSet):
+    queryset = BUDGETS_WITH_RELATIONS
     serializer_class = BudgetSerializer
     lookup_field = "pk"
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -71,8 +244,9 @@ class BudgetView(ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        filter = Q(user=user) | Q(shared_with_users__visitor=user)
-        return self.queryset.filter(filter)
+        if self.action in ("summary", "export", "import_statement"):
+            return Budget.objects.visible_to(user)
+        return self.queryset.visible_to(user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -80,9 +254,51 @@ class BudgetView(ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=["get"])
+    def summary(self, request, pk=None):
+        """Totals per category, entry type and day, month or year."""
+        budget = self.get_object()
+        query = BudgetSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        totals = budget_summary(budget, **query.validated_data)
+        return Response(BudgetSummarySerializer(totals, many=True).data)
+
+    @action(detail=True, url_path=EXPORT_URL_PATH)
+    def export(self, request, export_format, pk=None):
+        """Stream the entries of this budget as CSV, NDJSON or Parquet."""
+        budget = self.get_object()
+        queryset = FinancialEntry.objects.filter(category__budget=budget)
+        return export_entries(queryset, export_format, f"budget-{budget.pk}")
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_statement(self, request, pk=None):
+        """Import a CSV or OFX bank statement as entries of this budget."""
+        budget = self.get_object()
+        if budget.user_id != request.user.id:
+            raise ValidationError("This budget doesn't belong to you.")
+        serializer = StatementImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            importer = StatementImporter(
+                budget,
+                data["default_category"],
+                rules=data["rules"],
+                chunk_size=data["chunk_size"],
+            )
+            imported = importer.run(parse_statement(data["file"], data["format"]))
+        except ValueError as error:
+            raise ValidationError(str(error))
+        return Response({"imported": imported}, status=status.HTTP_201_CREATED)
+
 
-class SharedBudgetView(ModelViewSet):
-    queryset = Budget.objects.all()
+class SharedBudgetView(ConditionalGetMixin, CachedListMixin, ModelViewSet):
+    queryset = BUDGETS_WITH_RELATIONS
     serializer_class = SharedBudgetSerializer
     lookup_field = "pk"
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -91,7 +307,7 @@ class SharedBudgetView(ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return self.queryset.filter(shared_with_users__visitor=user)
+        return self.queryset.shared_with(user)
 
 
 class UserViewSet(ModelViewSet):
@@ -100,8 +316,8 @@ class UserViewSet(ModelViewSet):
     authentication_classes = [SessionAuthentication, TokenAuthentication]
 
 
-class BudgetUserViewSet(ModelViewSet):
-    queryset = BudgetUser.objects.all()
+class BudgetUserViewSet(ConditionalGetMixin, ModelViewSet):
+    queryset = BudgetUser.objects.select_related("owner", "visitor", "budget")
     serializer_class = BudgetUserSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["owner__username", "visitor__username", "budget__name"]
@@ -110,3 +326,52 @@ class BudgetUserViewSet(ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         return self.queryset.filter(owner=user)
+
+
+class SyncView(ConditionalGetMixin, APIView):
+    """Rows changed since ``?since=<token>`` in every budget the user can see.
+
+    Pass the returned ``token`` as ``since`` on the next call; without
+    ``since`` everything is returned.
+    """
+
+    authentication_classes = [SessionAuthentication, TokenAuthentication]
+
+    def get(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        changes = Changes(request.user, query.validated_data.get("since"))
+        context = self.get_serializer_context()
+        budget_users = BudgetUser.objects.filter(owner=request.user)
+        rows = {
+            "budgets": (
+                BudgetSerializer,
+                changes.filter(BUDGETS_WITH_RELATIONS, "pk"),
+            ),
+            # Entries are synced on their own, categories without them.
+            "categories": (
+                CategoryCompactSerializer,
+                changes.filter(Category.objects.all(), "budget").with_bilance(),
+            ),
+            "financial_entries": (
+                FinancialEntrySerializer,
+                changes.filter(
+                    FinancialEntry.objects.order_by("pk"), "category__budget"
+                ),
+            ),
+            "budget_users": (
+                BudgetUserSerializer,
+                changes.filter(
+                    budget_users.select_related("owner", "visitor", "budget"),
+                    "budget",
+                ),
+            ),
+        }
+        data = {"token": changes.token}
+        for name, (serializer_class, queryset) in rows.items():
+            data[name] = serializer_class(queryset, many=True, context=context).data
+        data["deleted"] = changes.deleted()
+        return Response(data)
+
+    def get_serializer_context(self):
+        return {"request": self.request, "format": self.format_kwarg, "view": self}